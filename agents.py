@@ -0,0 +1,206 @@
+from array import array
+
+import numpy as np
+
+# Per-agent numeric columns and their array typecodes
+COLUMNS = {
+    'x': 'i', 'y': 'i', 'interval': 'i', 'paused_until': 'q', 'retreating': 'b', 'retreat_start_time': 'q',
+}
+
+
+class AgentView:
+    """One agent's row in an AgentStore.
+
+    Attribute reads and writes go straight to the store's columns, so a
+    view holds nothing but its store and current slot. The store keeps one
+    view per agent and updates its slot when swap-remove relocates the row,
+    so a view stays valid (and usable as a key) for the agent's lifetime.
+    """
+
+    __slots__ = ('store', 'slot', 'id')
+
+    def __init__(self, store, slot, agent_id):
+        self.store = store
+        self.slot = slot
+        self.id = agent_id
+
+    @property
+    def alive(self):
+        return self.slot >= 0
+
+    @property
+    def agent_type(self):
+        return self.store.agent_type
+
+    @property
+    def color(self):
+        return self.store.color
+
+    @property
+    def x(self):
+        return self.store.x[self.slot]
+
+    @x.setter
+    def x(self, value):
+        self.store.x[self.slot] = value
+
+    @property
+    def y(self):
+        return self.store.y[self.slot]
+
+    @y.setter
+    def y(self, value):
+        self.store.y[self.slot] = value
+
+    @property
+    def interval(self):
+        return self.store.interval[self.slot]
+
+    @interval.setter
+    def interval(self, value):
+        self.store.interval[self.slot] = value
+
+    @property
+    def paused_until(self):
+        return self.store.paused_until[self.slot]
+
+    @paused_until.setter
+    def paused_until(self, value):
+        self.store.paused_until[self.slot] = value
+
+    @property
+    def retreating(self):
+        return bool(self.store.retreating[self.slot])
+
+    @retreating.setter
+    def retreating(self, value):
+        self.store.retreating[self.slot] = value
+
+    @property
+    def retreat_start_time(self):
+        return self.store.retreat_start_time[self.slot]
+
+    @retreat_start_time.setter
+    def retreat_start_time(self, value):
+        self.store.retreat_start_time[self.slot] = value
+
+    @property
+    def state(self):
+        return self.store.state[self.slot]
+
+    @state.setter
+    def state(self, value):
+        self.store.state[self.slot] = value
+
+    @property
+    def action(self):
+        return self.store.action[self.slot]
+
+    @action.setter
+    def action(self, value):
+        self.store.action[self.slot] = value
+
+    def pos(self):
+        slot = self.slot
+        return (self.store.x[slot], self.store.y[slot])
+
+    def move(self, dx, dy, grid_w, grid_h):
+        store, slot = self.store, self.slot
+        nx, ny = store.x[slot] + dx, store.y[slot] + dy
+        if 0 <= nx < grid_h and 0 <= ny < grid_w:
+            store.x[slot] = nx
+            store.y[slot] = ny
+
+    def __repr__(self):
+        return f"<{self.agent_type} {self.id} at {self.pos() if self.alive else 'removed'}>"
+
+
+class AgentStore:
+    """Agents of one type as parallel columns, one row (slot) per live agent.
+
+    Numeric state lives in typed arrays (see COLUMNS) so bulk work such as
+    building the threat map reads positions without creating tuples; the
+    Q-learning state and action stay in plain list columns since they are
+    Q-table keys. Agents get stable, increasing IDs; removal moves the last
+    row into the hole, so it is O(1) but does not preserve row order.
+    Iterating yields the AgentView of every live agent.
+    """
+
+    def __init__(self, agent_type, color):
+        self.agent_type = agent_type
+        self.color = color
+        for name, code in COLUMNS.items():
+            setattr(self, name, array(code))
+        self.state = []
+        self.action = []
+        self.views = []
+        self.slot_of = []  # agent ID -> slot, -1 once removed
+
+    def __len__(self):
+        return len(self.views)
+
+    def __iter__(self):
+        return iter(list(self.views))
+
+    def __bool__(self):
+        return bool(self.views)
+
+    def add(self, x, y, interval=1):
+        view = AgentView(self, len(self.views), len(self.slot_of))
+        for column, value in ((self.x, x), (self.y, y), (self.interval, interval), (self.paused_until, 0),
+                              (self.retreating, 0), (self.retreat_start_time, 0)):
+            column.append(value)
+        self.state.append(None)
+        self.action.append(None)
+        self.views.append(view)
+        self.slot_of.append(view.slot)
+        return view
+
+    def remove(self, view):
+        slot, last = view.slot, len(self.views) - 1
+        if slot != last:
+            for name in COLUMNS:
+                column = getattr(self, name)
+                column[slot] = column[last]
+            self.state[slot] = self.state[last]
+            self.action[slot] = self.action[last]
+            moved = self.views[last]
+            moved.slot = slot
+            self.views[slot] = moved
+            self.slot_of[moved.id] = slot
+        for name in COLUMNS:
+            getattr(self, name).pop()
+        self.state.pop()
+        self.action.pop()
+        self.views.pop()
+        self.slot_of[view.id] = -1
+        view.slot = -1
+
+    def get(self, agent_id):
+        # View of a live agent by ID, or None
+        slot = self.slot_of[agent_id] if 0 <= agent_id < len(self.slot_of) else -1
+        return self.views[slot] if slot >= 0 else None
+
+    def first_at(self, pos):
+        # The lowest-ID agent standing on pos, or None
+        x, y = pos
+        xs, ys = self.x, self.y
+        found = [v for slot, v in enumerate(self.views) if xs[slot] == x and ys[slot] == y]
+        return min(found, key=lambda v: v.id) if found else None
+
+    def by_id(self):
+        # Live views in ID (creation) order, which removals never disturb
+        views = self.views
+        return [views[slot] for slot in self.slot_of if slot >= 0]
+
+    def positions(self):
+        return list(zip(self.x, self.y))
+
+    def positions_by_id(self):
+        # {agent ID: cell}, in ID order
+        xs, ys = self.x, self.y
+        return {v.id: (xs[v.slot], ys[v.slot]) for v in self.by_id()}
+
+    def xy(self):
+        # Zero-copy int32 NumPy views of the x and y columns
+        return np.frombuffer(self.x, dtype=np.int32), np.frombuffer(self.y, dtype=np.int32)
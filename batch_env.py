@@ -0,0 +1,390 @@
+import numpy as np
+
+from constants import (ALL_ACTIONS, ALPHA, EAT_PAUSE, EPSILON, FOOD_SCORE, GAMMA, HUMAN_INTERVAL, POWER_DURATION,
+                       POWER_SPAWN_DELAY, RETREAT_WAIT, TIGER_INTERVAL)
+from qtable import ArrayQTable
+from simulation import corner_cells, make_rewards
+
+ACTION_DX = np.array([a[0] for a in ALL_ACTIONS], dtype=np.int32)
+ACTION_DY = np.array([a[1] for a in ALL_ACTIONS], dtype=np.int32)
+FAR = 1 << 20  # distance used for empty or masked-out slots
+RESULTS = ('win', 'lose', 'timeout')
+
+
+def nearest(px, py, xs, ys, alive):
+    # Closest alive slot per row; rows with no alive slot fall back to (px, py)
+    # like Simulation.closest. Ties go to the lowest slot, matching list order.
+    d = np.abs(xs - px[:, None]) + np.abs(ys - py[:, None])
+    d = np.where(alive, d, FAR)
+    j = d.argmin(axis=1)
+    rows = np.arange(len(px))
+    has = alive[rows, j]
+    nx = np.where(has, xs[rows, j], px)
+    ny = np.where(has, ys[rows, j], py)
+    return nx, ny, np.where(has, d[rows, j], 0)
+
+
+def nearest_distance(cx, cy, xs, ys, alive, king=False):
+    # Per row, steps from each candidate cell in cx/cy (n, m) to the nearest
+    # alive target; FAR if the row has none. Edge steps by default, 8-way
+    # (king) steps with king=True. On a grid without walls these are exactly
+    # the distances Simulation's BFS flow fields hold.
+    dx = np.abs(cx[:, :, None] - xs[:, None, :])
+    dy = np.abs(cy[:, :, None] - ys[:, None, :])
+    d = np.maximum(dx, dy) if king else dx + dy
+    return np.where(alive[:, None, :], d, FAR).min(axis=2)
+
+
+def encode_offsets(a, b, c, d):
+    # Vectorized qtable.encode_state over discretized offsets
+    a, b, c, d = (np.clip(v, -2, 2) + 2 for v in (a, b, c, d))
+    return ((a * 5 + b) * 5 + c) * 5 + d
+
+
+class BatchEnv:
+    """n_envs independent Tiger/Human/Food games stepped together with NumPy.
+
+    Follows Simulation's rules, timers and steering on grids without walls,
+    where its BFS flow fields reduce to nearest-target distances: tigers
+    descend edge-step (Manhattan) distance, humans 8-way (Chebyshev)
+    distance to food or any safe zone. Every agent, food item and timer is
+    stored in arrays shaped (n_envs, slots). Finished episodes are reset in
+    place at the end of the step that finished them. Spawns and the
+    exploration stream draw from one NumPy generator, so seeds do not
+    reproduce a Simulation's games.
+    """
+
+    def __init__(self, n_envs, grid_w=20, grid_h=20, q_table_humans=None, q_table_tigers=None,
+                 alpha=ALPHA, gamma=GAMMA, epsilon=EPSILON, lives=3, max_ticks=3000, seed=None,
+                 human_range=(2, 5), tiger_range=(2, 5), food_range=(5, 20), danger_radius=1, penalty_radius=2,
+                 rewards=None, food_score=FOOD_SCORE):
+        self.n_envs = n_envs
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.q_table_humans = q_table_humans if q_table_humans is not None else ArrayQTable()
+        self.q_table_tigers = q_table_tigers if q_table_tigers is not None else ArrayQTable()
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.rewards = make_rewards(rewards)
+        self.food_score = food_score
+        self.start_lives = lives
+        self.max_ticks = max_ticks
+        self.human_range = human_range
+        self.tiger_range = tiger_range
+        self.food_range = food_range
+        self.rng = np.random.default_rng(seed)
+
+        self.tiger_interval = TIGER_INTERVAL
+        self.human_interval = HUMAN_INTERVAL
+        self.eat_pause = EAT_PAUSE
+        self.retreat_wait = RETREAT_WAIT
+        self.power_duration = POWER_DURATION
+        self.danger_radius = danger_radius
+        self.penalty_radius = penalty_radius
+
+        n, hm, tm, fm = n_envs, human_range[1], tiger_range[1], food_range[1]
+        if hm + tm + fm > grid_w * grid_h:
+            raise ValueError("Grid too small for the requested agent and food counts")
+        i32 = np.int32
+        safe_zones = corner_cells(grid_w, grid_h)
+        self.safe_x = np.array([x for x, _ in safe_zones], dtype=i32)
+        self.safe_y = np.array([y for _, y in safe_zones], dtype=i32)
+
+        self.tick = np.zeros(n, i32)
+        self.score = np.zeros(n, i32)
+        self.lives = np.zeros(n, i32)
+        self.done = np.zeros(n, bool)
+
+        self.hx = np.zeros((n, hm), i32)
+        self.hy = np.zeros((n, hm), i32)
+        self.h_alive = np.zeros((n, hm), bool)
+        self.h_retreating = np.zeros((n, hm), bool)
+        self.h_retreat_start = np.zeros((n, hm), i32)
+        self.h_state = np.zeros((n, hm), np.intp)
+        self.h_action = np.zeros((n, hm), np.intp)
+
+        self.tx = np.zeros((n, tm), i32)
+        self.ty = np.zeros((n, tm), i32)
+        self.t_alive = np.zeros((n, tm), bool)
+        self.t_paused_until = np.zeros((n, tm), i32)
+        self.t_state = np.zeros((n, tm), np.intp)
+        self.t_action = np.zeros((n, tm), np.intp)
+
+        self.fx = np.zeros((n, fm), i32)
+        self.fy = np.zeros((n, fm), i32)
+        self.f_alive = np.zeros((n, fm), bool)
+
+        self.power_x = np.zeros(n, i32)
+        self.power_y = np.zeros(n, i32)
+        self.power_up = np.zeros(n, bool)
+        self.power_active = np.zeros(n, bool)
+        self.power_end_time = np.zeros(n, i32)
+        self.power_timer = np.zeros(n, i32)
+
+        self.env_steps = 0
+        self.episodes = 0
+        self.results = dict.fromkeys(RESULTS, 0)
+        self.reset_envs(np.arange(n))
+
+    def reset_envs(self, envs):
+        k = len(envs)
+        if k == 0:
+            return
+        rng = self.rng
+        hm, tm, fm = self.hx.shape[1], self.tx.shape[1], self.fx.shape[1]
+
+        # Draw hm + tm + fm distinct cells per env: humans, tigers and food never overlap
+        m = hm + tm + fm
+        keys = rng.random((k, self.grid_w * self.grid_h))
+        picked = np.argpartition(keys, m - 1, axis=1)[:, :m]
+        picked = np.take_along_axis(picked, np.argsort(np.take_along_axis(keys, picked, 1), axis=1), 1)
+        cx, cy = picked // self.grid_w, picked % self.grid_w
+
+        self.hx[envs], self.hy[envs] = cx[:, :hm], cy[:, :hm]
+        self.tx[envs], self.ty[envs] = cx[:, hm:hm + tm], cy[:, hm:hm + tm]
+        self.fx[envs], self.fy[envs] = cx[:, hm + tm:], cy[:, hm + tm:]
+        self.h_alive[envs] = np.arange(hm) < rng.integers(self.human_range[0], hm + 1, k)[:, None]
+        self.t_alive[envs] = np.arange(tm) < rng.integers(self.tiger_range[0], tm + 1, k)[:, None]
+        self.f_alive[envs] = np.arange(fm) < rng.integers(self.food_range[0], fm + 1, k)[:, None]
+
+        self.tick[envs] = 0
+        self.score[envs] = 0
+        self.lives[envs] = self.start_lives
+        self.done[envs] = False
+        self.h_retreating[envs] = False
+        self.t_paused_until[envs] = 0
+        self.power_up[envs] = False
+        self.power_active[envs] = False
+        self.power_timer[envs] = rng.integers(POWER_SPAWN_DELAY[0], POWER_SPAWN_DELAY[1] + 1, k)
+
+        # Initial states and actions
+        for i in range(hm):
+            x, y = self.hx[envs, i], self.hy[envs, i]
+            fnx, fny, _ = nearest(x, y, self.fx[envs], self.fy[envs], self.f_alive[envs])
+            tnx, tny, _ = nearest(x, y, self.tx[envs], self.ty[envs], self.t_alive[envs])
+            states = encode_offsets(fnx - x, fny - y, tnx - x, tny - y)
+            self.h_state[envs, i] = states
+            self.h_action[envs, i] = self.q_table_humans.choose_batch(states, self.epsilon, rng)
+        for j in range(tm):
+            x, y = self.tx[envs, j], self.ty[envs, j]
+            hnx, hny, _ = nearest(x, y, self.hx[envs], self.hy[envs], self.h_alive[envs])
+            fnx, fny, _ = nearest(x, y, self.fx[envs], self.fy[envs], self.f_alive[envs])
+            states = encode_offsets(hnx - x, hny - y, fnx - x, fny - y)
+            self.t_state[envs, j] = states
+            self.t_action[envs, j] = self.q_table_tigers.choose_batch(states, self.epsilon, rng)
+
+    def step(self):
+        # Advance every env one tick; returns the indices of envs that finished
+        self.tick += 1
+        tick = self.tick
+
+        spawn = ~self.power_up & ~self.power_active & (tick >= self.power_timer)
+        if spawn.any():
+            self.spawn_power(np.flatnonzero(spawn))
+
+        # Tigers move one slot at a time; a catch ends that env's tiger phase
+        moving = tick % self.tiger_interval == 0
+        for j in range(self.tx.shape[1]):
+            envs = np.flatnonzero(moving & self.t_alive[:, j] & (tick >= self.t_paused_until[:, j]))
+            if len(envs):
+                moving[self.move_tigers(envs, j)] = False
+
+        # Humans steer by the food as it was at the start of their phase, like Simulation's flow field
+        moving = (tick % self.human_interval == 0) & ~self.done
+        food = self.f_alive.copy()
+        for i in range(self.hx.shape[1]):
+            envs = np.flatnonzero(moving & self.h_alive[:, i])
+            if len(envs):
+                self.move_humans(envs, i, food[envs])
+
+        # Check if power-up collected
+        on_power = (self.t_alive & (self.tx == self.power_x[:, None]) & (self.ty == self.power_y[:, None])).any(axis=1)
+        picked = self.power_up & on_power & ~self.done
+        self.power_active[picked] = True
+        self.power_end_time[picked] = tick[picked] + self.power_duration
+        self.power_up[picked] = False
+
+        expired = self.power_active & (tick > self.power_end_time)
+        self.power_active[expired] = False
+        self.power_timer[expired] = tick[expired] + self.rng.integers(
+            POWER_SPAWN_DELAY[0], POWER_SPAWN_DELAY[1] + 1, int(expired.sum()))
+
+        self.env_steps += self.n_envs
+        return self.finish_envs()
+
+    def finish_envs(self):
+        live = ~self.done
+        win = live & ~self.f_alive.any(axis=1)
+        lose = self.done | (live & ~win & ~self.h_alive.any(axis=1))
+        timeout = np.zeros_like(win)
+        if self.max_ticks is not None:
+            timeout = live & ~win & ~lose & (self.tick >= self.max_ticks)
+        for name, mask in zip(RESULTS, (win, lose, timeout)):
+            self.results[name] += int(mask.sum())
+        finished = np.flatnonzero(win | lose | timeout)
+        self.episodes += len(finished)
+        self.reset_envs(finished)
+        return finished
+
+    def run(self, n_steps):
+        for _ in range(n_steps):
+            self.step()
+
+    def move_tigers(self, envs, j):
+        # Move tiger slot j in the given envs; returns the envs where it caught a human
+        x, y = self.tx[envs, j], self.ty[envs, j]
+        hx, hy, h_alive = self.hx[envs], self.hy[envs], self.h_alive[envs]
+        fx, fy, f_alive = self.fx[envs], self.fy[envs], self.f_alive[envs]
+
+        # Determine mode: attack the nearest human if close, else guard food
+        hnx, hny, dist_human = nearest(x, y, hx, hy, h_alive)
+        fnx, fny, _ = nearest(x, y, fx, fy, f_alive)
+        attack = dist_human <= 3
+        hunt = self.descend(x, y, hx, hy, h_alive, 4)
+        guard = self.descend(x, y, fx, fy, f_alive, 4)
+        nx, ny = self.clamp_move(x, y, *np.where(attack, hunt, guard))
+        self.tx[envs, j], self.ty[envs, j] = nx, ny
+
+        hit = h_alive & (hx == nx[:, None]) & (hy == ny[:, None])
+        caught = hit.any(axis=1)
+
+        # tiger_reward
+        r = self.rewards
+        reward = np.full(len(envs), r['tiger_step'], dtype=np.float32)
+        _, _, dist_food = nearest(nx, ny, fx, fy, f_alive)
+        reward += r['tiger_guard'] * (dist_food <= 2)
+        cnx, cny, _ = nearest(nx, ny, hx, hy, h_alive)
+        before = np.abs(x - cnx) + np.abs(y - cny)
+        after = np.abs(nx - cnx) + np.abs(ny - cny)
+        reward += r['tiger_closer'] * (after < before)
+        reward += r['tiger_powered'] * self.power_active[envs]
+
+        q = self.q_table_tigers
+        next_state = encode_offsets(hnx - nx, hny - ny, fnx - nx, fny - ny)
+        next_action = q.choose_batch(next_state, self.epsilon, self.rng)
+        q.update_batch(self.t_state[envs, j], self.t_action[envs, j], reward, next_state, next_action,
+                       self.alpha, self.gamma)
+        self.t_state[envs, j] = next_state
+        self.t_action[envs, j] = next_action
+
+        eaters = envs[caught]
+        self.t_paused_until[eaters, j] = self.tick[eaters] + self.eat_pause
+        self.h_alive[eaters, hit[caught].argmax(axis=1)] = False
+        self.lives[eaters] -= 1
+        self.done[eaters[self.lives[eaters] <= 0]] = True
+        return eaters
+
+    def move_humans(self, envs, i, food):
+        # food: the f_alive rows of envs as of the start of the human phase
+        x, y = self.hx[envs, i], self.hy[envs, i]
+        retreating = self.h_retreating[envs, i]
+        in_safe = retreating & ((x[:, None] == self.safe_x) & (y[:, None] == self.safe_y)).any(axis=1)
+        rested = in_safe & (self.tick[envs] - self.h_retreat_start[envs, i] >= self.retreat_wait)
+        self.h_retreating[envs[rested], i] = False
+
+        # Retreating humans step toward the nearest safe zone and skip learning
+        walking = retreating & ~in_safe
+        if walking.any():
+            we = envs[walking]
+            sx = np.broadcast_to(self.safe_x, (len(we), len(self.safe_x)))
+            sy = np.broadcast_to(self.safe_y, (len(we), len(self.safe_y)))
+            mx, my = self.safe_step(we, x[walking], y[walking], sx, sy, np.ones(sx.shape, bool))
+            self.hx[we, i], self.hy[we, i] = self.clamp_move(x[walking], y[walking], mx, my)
+
+        normal = ~retreating | rested
+        if not normal.any():
+            return
+        envs, x, y, food = envs[normal], x[normal], y[normal], food[normal]
+        fx, fy, f_alive = self.fx[envs], self.fy[envs], self.f_alive[envs]
+        fnx, fny, dist_before = nearest(x, y, fx, fy, f_alive)
+        tnx, tny, _ = nearest(x, y, self.tx[envs], self.ty[envs], self.t_alive[envs])
+
+        mx, my = self.safe_step(envs, x, y, fx, fy, food)
+        nx, ny = self.clamp_move(x, y, mx, my)
+        self.hx[envs, i], self.hy[envs, i] = nx, ny
+
+        # If food collected: score, then retreat to a safe zone
+        hit = f_alive & (fx == nx[:, None]) & (fy == ny[:, None])
+        got = hit.any(axis=1)
+        if got.any():
+            ge = envs[got]
+            self.f_alive[ge, hit[got].argmax(axis=1)] = False
+            self.score[ge] += self.food_score
+            self.h_retreating[ge, i] = True
+            self.h_retreat_start[ge, i] = self.tick[ge]
+
+        learn = ~got
+        if not learn.any():
+            return
+        le = envs[learn]
+        nx, ny, x, y = nx[learn], ny[learn], x[learn], y[learn]
+        fnx, fny, tnx, tny = fnx[learn], fny[learn], tnx[learn], tny[learn]
+
+        # human_reward (food was collected above, so human_food never applies here)
+        r = self.rewards
+        reward = np.full(len(le), r['human_step'], dtype=np.float32)
+        _, _, dist_after = nearest(nx, ny, fx[learn], fy[learn], f_alive[learn])
+        reward += r['human_closer'] * (dist_after < dist_before[learn])
+        _, _, dist_tiger = nearest(nx, ny, self.tx[le], self.ty[le], self.t_alive[le])
+        reward += r['human_near_tiger'] * (dist_tiger <= self.penalty_radius)
+
+        q = self.q_table_humans
+        next_state = encode_offsets(fnx - nx, fny - ny, tnx - nx, tny - ny)
+        next_action = q.choose_batch(next_state, self.epsilon, self.rng)
+        q.update_batch(self.h_state[le, i], self.h_action[le, i], reward, next_state, next_action,
+                       self.alpha, self.gamma)
+        self.h_state[le, i] = next_state
+        self.h_action[le, i] = next_action
+
+    def descend(self, x, y, xs, ys, alive, n_moves=len(ALL_ACTIONS), king=False):
+        # Vectorized FlowField.step: the first of the first n_moves actions onto
+        # a cell closer to the nearest alive target, else (0, 0); as a (2, n) array
+        cx = x[:, None] + ACTION_DX[:n_moves]
+        cy = y[:, None] + ACTION_DY[:n_moves]
+        inside = (cx >= 0) & (cx < self.grid_h) & (cy >= 0) & (cy < self.grid_w)
+        d = np.where(inside, nearest_distance(cx, cy, xs, ys, alive, king), FAR)
+        here = nearest_distance(x[:, None], y[:, None], xs, ys, alive, king)[:, 0]
+        best = d.argmin(axis=1)
+        closer = d[np.arange(len(x)), best] < here
+        return np.array([np.where(closer, ACTION_DX[best], 0), np.where(closer, ACTION_DY[best], 0)])
+
+    def safe_step(self, envs, x, y, xs, ys, alive):
+        # Vectorized Simulation.safe_step: of the moves keeping clear of every tiger,
+        # the one nearest (in 8-way steps) to an alive target; else the plain descent
+        cx = x[:, None] + ACTION_DX
+        cy = y[:, None] + ACTION_DY
+        inside = (cx >= 0) & (cx < self.grid_h) & (cy >= 0) & (cy < self.grid_w)
+        tx, ty, t_alive = self.tx[envs], self.ty[envs], self.t_alive[envs]
+        dist = np.abs(cx[:, :, None] - tx[:, None, :]) + np.abs(cy[:, :, None] - ty[:, None, :])
+        dist = np.where(t_alive[:, None, :], dist, FAR).min(axis=2)
+        safe = inside & (dist > self.danger_radius)
+
+        # Unsafe moves rank below safe ones that cannot reach a target
+        cost = np.where(safe, nearest_distance(cx, cy, xs, ys, alive, king=True), FAR + 1)
+        best = cost.argmin(axis=1)
+        any_safe = safe.any(axis=1)
+        ox, oy = self.descend(x, y, xs, ys, alive, king=True)
+        return np.where(any_safe, ACTION_DX[best], ox), np.where(any_safe, ACTION_DY[best], oy)
+
+    def clamp_move(self, x, y, mx, my):
+        # AgentView.move: moves that would leave the grid are ignored
+        nx, ny = x + mx, y + my
+        inside = (nx >= 0) & (nx < self.grid_h) & (ny >= 0) & (ny < self.grid_w)
+        return np.where(inside, nx, x), np.where(inside, ny, y)
+
+    def spawn_power(self, envs):
+        # Rejection-sample a free cell per env; envs that miss retry next tick
+        for _ in range(32):
+            if not len(envs):
+                return
+            px = self.rng.integers(0, self.grid_h, len(envs))
+            py = self.rng.integers(0, self.grid_w, len(envs))
+            taken = np.zeros(len(envs), bool)
+            for xs, ys, alive in ((self.hx, self.hy, self.h_alive), (self.tx, self.ty, self.t_alive),
+                                  (self.fx, self.fy, self.f_alive)):
+                taken |= (alive[envs] & (xs[envs] == px[:, None]) & (ys[envs] == py[:, None])).any(axis=1)
+            ok = envs[~taken]
+            self.power_x[ok], self.power_y[ok] = px[~taken], py[~taken]
+            self.power_up[ok] = True
+            envs = envs[taken]
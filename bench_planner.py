@@ -0,0 +1,100 @@
+import argparse
+import random
+import time
+
+from planner import RolloutController
+from qtable import ArrayQTable, load_tables
+from simulation import Simulation
+from world import World
+
+
+def new_sim(args, seed, q_humans, q_tigers):
+    return Simulation(args.grid, args.grid, q_humans, q_tigers, lives=args.lives, max_ticks=args.max_ticks,
+                      humans=args.humans, tigers=args.tigers, food=args.food, seed=seed)
+
+
+def run_sim(sim):
+    while not sim.done:
+        sim.step()
+    return sim.result, sim.score, sim.start_lives - max(sim.lives, 0), sim.tick
+
+
+def run_world(world, seed, tigers=None, humans=None):
+    # Like planner.play, timing each controller call that had agents to move
+    rng = random.Random(seed)
+    decisions, thinking = 0, 0.0
+    while not world.done:
+        moves = []
+        for controller in (tigers, humans):
+            if controller is None or not world.due(controller.tigers):
+                moves.append(None)
+                continue
+            start = time.perf_counter()
+            moves.append(controller.moves(world))
+            thinking += time.perf_counter() - start
+            decisions += 1
+        world.step(rng, *moves)
+    return (world.result, world.score, world.start_lives - max(world.lives, 0), world.tick), decisions, thinking
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Play the same games with the Q-learning agents and with rollout controllers on World forks.")
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--grid', type=int, default=15, help="grid side")
+    parser.add_argument('--humans', type=int, default=3)
+    parser.add_argument('--tigers', type=int, default=3)
+    parser.add_argument('--food', type=int, default=10)
+    parser.add_argument('--lives', type=int, default=3)
+    parser.add_argument('--max-ticks', type=int, default=1500)
+    parser.add_argument('--rollouts', type=int, default=4, help="rollouts per candidate move")
+    parser.add_argument('--depth', type=int, default=20, help="ticks per rollout")
+    parser.add_argument('--checkpoint', default=None, help="Q-tables for the learning agents (default: fresh)")
+    args = parser.parse_args(argv)
+
+    if args.checkpoint:
+        q_humans, q_tigers, _ = load_tables(args.checkpoint, mmap=False)
+    else:
+        q_humans, q_tigers = ArrayQTable(), ArrayQTable()
+
+    # Every setup plays the same starting positions: game i is seeded args.seed + i
+    setups = {
+        'q-learning (Simulation)': None,
+        'built-in steering (World)': {},
+        'rollout tigers': {'tigers': True},
+        'rollout humans': {'humans': True},
+    }
+    print(f"{args.games} games on {args.grid}x{args.grid}, {args.humans} humans, {args.tigers} tigers, "
+          f"{args.food} food, {args.lives} lives; rollouts {args.rollouts} x {args.depth} ticks")
+    print(f"{'agents':28} {'human wins':>10} {'score':>7} {'lives lost':>10} {'ticks':>7} "
+          f"{'ms/decision':>11} {'forks/s':>9} {'wall s':>7}")
+    for name, sides in setups.items():
+        outcomes, decisions, thinking, forks = [], 0, 0.0, 0
+        start = time.perf_counter()
+        for i in range(args.games):
+            seed = args.seed + i
+            sim = new_sim(args, seed, q_humans, q_tigers)
+            if sides is None:
+                outcomes.append(run_sim(sim))
+                continue
+            controllers = {side: RolloutController(side == 'tigers', args.rollouts, args.depth, seed)
+                           for side in sides}
+            outcome, n, t = run_world(World.from_sim(sim), seed, controllers.get('tigers'), controllers.get('humans'))
+            outcomes.append(outcome)
+            decisions += n
+            thinking += t
+            forks += sum(c.forks for c in controllers.values())
+        wall = time.perf_counter() - start
+        n = len(outcomes)
+        wins = sum(o[0] == 'win' for o in outcomes) / n
+        score = sum(o[1] for o in outcomes) / n
+        lost = sum(o[2] for o in outcomes) / n
+        ticks = sum(o[3] for o in outcomes) / n
+        per_decision = f"{thinking / decisions * 1000:11.1f}" if decisions else f"{'-':>11}"
+        fork_rate = f"{forks / thinking:9.0f}" if thinking else f"{'-':>9}"
+        print(f"{name:28} {wins:10.2f} {score:7.1f} {lost:10.2f} {ticks:7.0f} {per_decision} {fork_rate} {wall:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
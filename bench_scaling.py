@@ -0,0 +1,52 @@
+import argparse
+import random
+import time
+
+from simulation import Simulation
+
+# (grid side, humans, tigers, food)
+SCALES = [
+    (20, 5, 5, 20),
+    (100, 100, 100, 500),
+    (250, 500, 500, 2000),
+    (500, 2000, 2000, 5000),
+    (500, 5000, 5000, 10000),
+]
+
+
+def bench(side, humans, tigers, food, ticks, seed):
+    random.seed(seed)
+    start = time.perf_counter()
+    # One life per human so large populations are not cut short by catches
+    sim = Simulation(side, side, humans=humans, tigers=tigers, food=food, lives=humans)
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    done = 0
+    while done < ticks and not sim.done:
+        sim.step()
+        done += 1
+    elapsed = time.perf_counter() - start
+    return setup, done, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure simulation ticks/sec as the world and population grow.")
+    parser.add_argument('--ticks', type=int, default=100, help="ticks to run per scale")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-side', type=int, default=None, help="skip grids larger than this")
+    args = parser.parse_args(argv)
+
+    print(f"{'grid':>9} {'humans':>7} {'tigers':>7} {'food':>6} {'setup s':>8} {'ticks':>6} {'ticks/s':>9} {'agent-moves/s':>14}")
+    for side, humans, tigers, food in SCALES:
+        if args.max_side is not None and side > args.max_side:
+            continue
+        setup, done, elapsed = bench(side, humans, tigers, food, args.ticks, args.seed)
+        rate = done / elapsed if elapsed else float('inf')
+        # Tigers move every TIGER_INTERVAL ticks and humans every HUMAN_INTERVAL ticks
+        moves = rate * (tigers / 2 + humans / 5)
+        print(f"{side:>4}x{side:<4} {humans:>7} {tigers:>7} {food:>6} {setup:>8.2f} {done:>6} {rate:>9.1f} {moves:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
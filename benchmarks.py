@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# Rendering benchmarks draw into an off-screen SDL surface
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+import pygame
+
+from constants import ALL_ACTIONS
+from qtable import make_q_table
+from render import Renderer
+from simulation import Simulation
+
+# (grid side, humans, tigers, food)
+SIZES = [(20, 5, 5, 20), (100, 100, 100, 500), (250, 500, 500, 2000)]
+QUICK_SIZES = SIZES[:2]
+DENSITIES = [0.1, 0.5, 0.9]
+
+
+def measure(fn, number, repeat):
+    # Best-of-repeat wall time for `number` calls of fn(); setup must happen outside
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def result(name, params, number, seconds):
+    return {'name': name, 'params': params, 'calls': number, 'seconds': seconds,
+            'us_per_call': seconds / number * 1e6, 'calls_per_s': number / seconds if seconds else None}
+
+
+def make_sim(seed, side, humans, tigers, food):
+    random.seed(seed)
+    return Simulation(side, side, humans=humans, tigers=tigers, food=food, lives=humans)
+
+
+def random_states(rng, n):
+    return [tuple(rng.randint(-2, 2) for _ in range(4)) for _ in range(n)]
+
+
+def bench_q_tables(seed, repeat, quick):
+    rng = random.Random(seed)
+    states = random_states(rng, 1000)
+    actions = [rng.choice(ALL_ACTIONS) for _ in states]
+    number = 5000 if quick else 50000
+    for backend in ('dict', 'array', 'bounded'):
+        table = make_q_table(backend)
+        for s, a in zip(states, actions):
+            table.update(s, a, rng.random(), s, a, 0.1, 0.9)
+        it = iter(range(1 << 62))
+
+        def choose():
+            table.choose(states[next(it) % 1000], 0.1, rng)
+
+        def update():
+            i = next(it) % 1000
+            table.update(states[i], actions[i], 1.0, states[i - 1], actions[i - 1], 0.1, 0.9)
+
+        yield result('choose_action', {'backend': backend}, number, measure(choose, number, repeat))
+        yield result('update_q', {'backend': backend}, number, measure(update, number, repeat))
+
+
+def bench_phases(seed, repeat, sizes):
+    for side, humans, tigers, food in sizes:
+        params = {'grid': side, 'humans': humans, 'tigers': tigers, 'food': food}
+        number = 20
+        for phase in ('move_tigers', 'move_humans'):
+            best = float('inf')
+            for _ in range(repeat):
+                # Fresh world from the same seed so every repeat does identical work
+                sim = make_sim(seed, side, humans, tigers, food)
+                run = getattr(sim, phase)
+                start = time.perf_counter()
+                for _ in range(number):
+                    sim.tick += 1
+                    run([])
+                best = min(best, time.perf_counter() - start)
+            yield result(phase, params, number, best)
+
+
+def bench_queries(seed, repeat, sizes, quick):
+    number = 2000 if quick else 20000
+    for side, humans, tigers, food in sizes:
+        params = {'grid': side, 'humans': humans, 'tigers': tigers, 'food': food}
+        sim = make_sim(seed, side, humans, tigers, food)
+        rng = random.Random(seed)
+        points = [(rng.randrange(side), rng.randrange(side)) for _ in range(1000)]
+        tiger_positions = [t.pos() for t in sim.tigers]
+        it = iter(range(1 << 62))
+
+        def point():
+            return points[next(it) % 1000]
+
+        yield result('closest', dict(params, targets='tigers'), number,
+                     measure(lambda: sim.closest(point(), tiger_positions), number, repeat))
+        yield result('closest', dict(params, targets='food'), number,
+                     measure(lambda: sim.closest(point(), sim.food_list), number, repeat))
+        yield result('index_nearest', dict(params, targets='tigers'), number,
+                     measure(lambda: sim.tiger_index.nearest(point()), number, repeat))
+        yield result('index_nearest', dict(params, targets='food'), number,
+                     measure(lambda: sim.food_index.nearest(point()), number, repeat))
+        yield result('manhattan', params, number, measure(lambda: sim.manhattan(point(), point()), number, repeat))
+        yield result('make_human_state', params, number,
+                     measure(lambda: sim.make_human_state(point(), point(), point()), number, repeat))
+        yield result('make_tiger_state', params, number,
+                     measure(lambda: sim.make_tiger_state(point(), point(), point()), number, repeat))
+
+
+def bench_spawns(seed, repeat, quick):
+    side = 50 if quick else 100
+    for density in DENSITIES:
+        # Half the occupied cells are humans, half tigers
+        agents = int(side * side * density) // 2
+        params = {'grid': side, 'density': density}
+        sim = make_sim(seed, side, agents, agents, 1)
+        count = 20
+        yield result('spawn_food', dict(params, count=count), 10,
+                     measure(lambda: sim.spawn_food(count), 10, repeat))
+        yield result('spawn_power', params, 100, measure(sim.spawn_power, 100, repeat))
+
+
+def bench_render(seed, repeat, quick):
+    pygame.init()
+    configs = [(20, 30), (100, 8)] if quick else [(20, 30), (100, 8), (250, 3)]
+    for side, cell in configs:
+        humans = tigers = max(5, side * side // 100)
+        params = {'grid': side, 'cell_size': cell, 'humans': humans, 'tigers': tigers}
+        sim = make_sim(seed, side, humans, tigers, humans * 4)
+        window = pygame.display.set_mode((side * cell, side * cell))
+        renderer = Renderer(window, side, side, cell, sim.safe_zones, sim.obstacles)
+
+        def full_frame():
+            renderer.invalidate()
+            renderer.draw(sim)
+
+        yield result('render_full', params, 20, measure(full_frame, 20, repeat))
+
+        renderer.draw(sim)
+        number = 50
+        best = float('inf')
+        for _ in range(repeat):
+            # Time only the drawing of each incremental frame, not the sim step
+            elapsed = 0.0
+            for _ in range(number):
+                sim.step()
+                start = time.perf_counter()
+                renderer.draw(sim)
+                elapsed += time.perf_counter() - start
+            best = min(best, elapsed)
+        yield result('render_incremental', params, number, best)
+    pygame.quit()
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+GROUPS = {
+    'qtable': lambda a: bench_q_tables(a.seed, a.repeat, a.quick),
+    'phases': lambda a: bench_phases(a.seed, a.repeat, a.sizes),
+    'queries': lambda a: bench_queries(a.seed, a.repeat, a.sizes, a.quick),
+    'spawn': lambda a: bench_spawns(a.seed, a.repeat, a.quick),
+    'render': lambda a: bench_render(a.seed, a.repeat, a.quick),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark simulation, learning and rendering hot paths.")
+    parser.add_argument('--only', nargs='*', choices=sorted(GROUPS), help="benchmark groups to run (default: all)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="repeats per benchmark; the best is reported")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes and fewer calls")
+    parser.add_argument('--out', default=None, help="write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+    args.sizes = QUICK_SIZES if args.quick else SIZES
+
+    results = []
+    for group in args.only or GROUPS:
+        for r in GROUPS[group](args):
+            r['group'] = group
+            results.append(r)
+            print(f"{group:8} {r['name']:20} {json.dumps(r['params']):70} {r['us_per_call']:12.2f} us",
+                  file=sys.stderr)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'quick': args.quick,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
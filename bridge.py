@@ -0,0 +1,28 @@
+from collections import deque
+
+
+class Channel:
+    """One-way message pipe between a producer and a consumer thread.
+
+    put() and drain() only use deque.append and deque.popleft, which are
+    atomic in CPython, so neither side ever waits for a lock held by the
+    other. Messages are (kind, value) pairs and arrive in the order sent.
+    """
+
+    def __init__(self):
+        self.items = deque()
+
+    def put(self, kind, value=None):
+        self.items.append((kind, value))
+
+    def drain(self):
+        # Every pending message, oldest first
+        items = self.items
+        out = []
+        while items:
+            out.append(items.popleft())
+        return out
+
+    def latest(self):
+        # Pending messages coalesced to the newest value of each kind
+        return dict(self.drain())
@@ -0,0 +1,31 @@
+EDGE_ACTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+ALL_ACTIONS = EDGE_ACTIONS + [(-1, 1), (1, 1), (1, -1), (-1, -1)]
+COLORS = {'human': (0, 0, 255), 'tiger': (255, 0, 0), 'food': (255, 255, 0), 'power': (0, 255, 0)}
+
+# All game timers are counted in logical ticks. A viewer that wants the old
+# wall-clock pacing plays one tick every TICK_MS milliseconds.
+TICK_MS = 100
+TIGER_INTERVAL = 2        # tigers move every 200 ms
+HUMAN_INTERVAL = 5        # humans move every 500 ms
+EAT_PAUSE = 40            # tiger rests 4 s after catching a human
+RETREAT_WAIT = 20         # human waits 2 s before leaving a safe zone
+POWER_SPAWN_DELAY = (50, 100)
+POWER_DURATION = 80
+
+# Q-learning defaults
+ALPHA = 0.1
+GAMMA = 0.9
+EPSILON = 0.1
+
+# Reward shaping; Simulation and BatchEnv take a `rewards` dict overriding any of these
+REWARDS = {
+    'human_step': -0.1,       # every move, to encourage fast food collection
+    'human_food': 10,         # landing on food
+    'human_closer': 1,        # moving closer to the nearest food
+    'human_near_tiger': -5,   # ending a move within penalty_radius of a tiger
+    'tiger_step': -0.05,
+    'tiger_guard': 2,         # ending a move within 2 cells of food
+    'tiger_closer': 2,        # moving closer to the nearest human
+    'tiger_powered': 1,       # while the power-up is active
+}
+FOOD_SCORE = 10
@@ -0,0 +1,77 @@
+def clamp(n, radius):
+    # Bucket a signed distance into -radius..radius
+    if n < -radius:
+        return -radius
+    elif n > radius:
+        return radius
+    else:
+        return n
+
+
+class OffsetEncoder:
+    """The original states: offsets to the nearest food and opponent, clamped to +-radius.
+
+    With the default radius of 2 there are 5 ** 4 = 625 states, which is
+    the layout ArrayQTable and BatchEnv index directly (compact = True).
+    """
+
+    def __init__(self, radius=2):
+        self.radius = radius
+        self.compact = radius == 2
+
+    def human_state(self, sim, human_pos, food_pos, tiger_pos, human=None):
+        r = self.radius
+        return (clamp(food_pos[0] - human_pos[0], r), clamp(food_pos[1] - human_pos[1], r),
+                clamp(tiger_pos[0] - human_pos[0], r), clamp(tiger_pos[1] - human_pos[1], r))
+
+    def tiger_state(self, sim, tiger_pos, human_pos, food_pos, tiger=None):
+        r = self.radius
+        return (clamp(human_pos[0] - tiger_pos[0], r), clamp(human_pos[1] - tiger_pos[1], r),
+                clamp(food_pos[0] - tiger_pos[0], r), clamp(food_pos[1] - tiger_pos[1], r))
+
+
+class RichEncoder:
+    """Wider offsets, several nearest tigers, power-up and safe-zone flags.
+
+    A human sees the nearest food and its `tigers` nearest tigers (missing
+    ones read as offset 0, like an empty nearest query), all clamped to
+    +-radius, plus whether the tigers are powered and whether it stands in
+    a safe zone. Humans do not learn while retreating, so a retreat flag
+    would always read 0 here. A tiger sees the nearest human and food and
+    the power flag.
+
+    The state space is far too large for ArrayQTable; pair it with a
+    BoundedQTable.
+    """
+
+    compact = False
+
+    def __init__(self, radius=8, tigers=2):
+        self.radius = radius
+        self.tigers = tigers
+
+    def human_state(self, sim, human_pos, food_pos, tiger_pos, human=None):
+        r = self.radius
+        x, y = human_pos
+        state = [clamp(food_pos[0] - x, r), clamp(food_pos[1] - y, r)]
+        near = sim.tiger_index.nearest_k(human_pos, self.tigers) if self.tigers > 1 else [tiger_pos]
+        for tx, ty in near:
+            state += (clamp(tx - x, r), clamp(ty - y, r))
+        state += (0, 0) * (self.tigers - len(near))
+        state += (int(sim.power_active), int(sim.in_safe_zone(human_pos)))
+        return tuple(state)
+
+    def tiger_state(self, sim, tiger_pos, human_pos, food_pos, tiger=None):
+        r = self.radius
+        x, y = tiger_pos
+        return (clamp(human_pos[0] - x, r), clamp(human_pos[1] - y, r),
+                clamp(food_pos[0] - x, r), clamp(food_pos[1] - y, r), int(sim.power_active))
+
+
+ENCODERS = {'offset': OffsetEncoder, 'rich': RichEncoder}
+
+
+def make_encoder(name='offset', **options):
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown state encoder: {name}")
+    return ENCODERS[name](**options)
@@ -0,0 +1,257 @@
+import csv
+import json
+import math
+import time
+from collections import deque
+
+import pygame
+
+PERCENTILES = (50, 95, 99)
+HUD_REFRESH = 0.25  # seconds between HUD text updates
+HUD_COLOR = (0, 0, 0)
+HUD_BACKGROUND = (255, 255, 224)
+
+
+def percentile(values, p):
+    # Nearest-rank percentile of a sorted list
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def table_size(table):
+    # (states visited, states the table can hold or currently holds)
+    capacity = getattr(table, 'capacity', None)
+    if capacity is None:
+        q = getattr(table, 'q', None)
+        capacity = q.shape[0] if q is not None else len(table)
+    return len(table), capacity
+
+
+class PhaseTimer:
+    __slots__ = ('samples', 'start')
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class Profiler:
+    """Rolling per-phase timings and counters for the game loop.
+
+    Frame phases are timed with `with profiler.phase(name):`, which is a
+    shared no-op while the profiler is disabled. Tick phases are timed by
+    attach(), which shadows a Simulation's step, move_tigers, move_humans
+    and update_q with timed wrappers on the instance (wrap() does the same
+    for any other object's method); detach() removes them, so an
+    unprofiled simulation runs its own methods untouched.
+    Q updates are timed inside the tiger and human phases and reported as
+    their total per tick.
+    """
+
+    def __init__(self, window=600, enabled=False):
+        self.window = window
+        self.enabled = enabled
+        self.samples = {}
+        self.timers = {}
+        self.counters = {'ticks': 0, 'frames': 0, 'q_updates': 0}
+        self.rates = {}
+        self.sim = None
+        self.wrapped = []
+        self.q_time = 0.0
+        self.rate_mark = (time.perf_counter(), dict(self.counters))
+
+    def series(self, name):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        return samples
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = PhaseTimer(self.series(name))
+        return timer
+
+    def wrap(self, obj, name, phase):
+        # Shadow obj.name with a version that records each call under phase
+        method = getattr(obj, name)
+        samples = self.series(phase)
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            result = method(*args)
+            samples.append(clock() - start)
+            return result
+        setattr(obj, name, timed)
+        self.wrapped.append((obj, name))
+
+    def attach(self, sim):
+        self.sim = sim
+        self.wrap(sim, 'step', 'tick')
+        self.wrap(sim, 'move_tigers', 'tigers')
+        self.wrap(sim, 'move_humans', 'humans')
+        clock = time.perf_counter
+        counters = self.counters
+        q_samples = self.series('q_update')
+        step, update_q = sim.step, sim.update_q
+
+        def timed_step():
+            self.q_time = 0.0
+            events = step()
+            counters['ticks'] += 1
+            if self.q_time:
+                q_samples.append(self.q_time)
+            return events
+
+        def timed_update_q(*args):
+            start = clock()
+            update_q(*args)
+            self.q_time += clock() - start
+            counters['q_updates'] += 1
+
+        sim.step = timed_step
+        sim.update_q = timed_update_q
+        self.wrapped += [(sim, 'update_q')]
+
+    def detach(self):
+        # Drop every instance-level wrapper, uncovering the original methods
+        for obj, name in self.wrapped:
+            obj.__dict__.pop(name, None)
+        self.wrapped = []
+        self.sim = None
+
+    def end_frame(self):
+        # Count a drawn frame and refresh the per-second rates every HUD_REFRESH
+        self.counters['frames'] += 1
+        now = time.perf_counter()
+        then, previous = self.rate_mark
+        if now - then >= HUD_REFRESH:
+            self.rates = {f"{name}_per_s": (count - previous.get(name, 0)) / (now - then)
+                          for name, count in self.counters.items()}
+            self.rate_mark = (now, dict(self.counters))
+            return True
+        return False
+
+    def reset(self):
+        for samples in self.samples.values():
+            samples.clear()
+
+    def stats(self):
+        # {phase: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}} over the rolling window
+        out = {}
+        for name, samples in list(self.samples.items()):
+            values = sorted(samples)
+            if not values:
+                continue
+            row = {'count': len(values), 'mean_ms': sum(values) / len(values) * 1000}
+            for p in PERCENTILES:
+                row[f"p{p}_ms"] = percentile(values, p) * 1000
+            row['max_ms'] = values[-1] * 1000
+            out[name] = row
+        return out
+
+    def snapshot(self):
+        counters = dict(self.counters)
+        sim = self.sim
+        if sim is not None:
+            counters['humans'] = len(sim.humans)
+            counters['tigers'] = len(sim.tigers)
+            counters['food'] = len(sim.food_list)
+            for who, table in (('humans', sim.q_table_humans), ('tigers', sim.q_table_tigers)):
+                counters[f"q_states_visited_{who}"], counters[f"q_states_{who}"] = table_size(table)
+                if hasattr(table, 'stats'):
+                    # Bounded tables also report their memory use and lookup hit rate
+                    stats = table.stats()
+                    counters[f"q_bytes_{who}"] = stats['bytes']
+                    counters[f"q_hit_rate_{who}"] = round(stats['hit_rate'], 4)
+                    counters[f"q_evictions_{who}"] = stats['evictions']
+        return {'time': time.time(), 'phases': self.stats(), 'counters': counters, 'rates': dict(self.rates)}
+
+    def export(self, path):
+        # JSON keeps everything; CSV has one row per phase with the counters repeated as columns
+        snap = self.snapshot()
+        if path.lower().endswith('.csv'):
+            extra = dict(snap['counters'], **snap['rates'])
+            fields = ['phase', 'count', 'mean_ms'] + [f"p{p}_ms" for p in PERCENTILES] + ['max_ms'] + list(extra)
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                for name, row in snap['phases'].items():
+                    writer.writerow(dict(row, phase=name, **extra))
+        else:
+            with open(path, 'w') as f:
+                json.dump(snap, f, indent=2)
+
+
+class Hud:
+    """Performance overlay blitted in the top-left corner of the window.
+
+    The text is re-rendered every HUD_REFRESH seconds and blitted every
+    frame. expose() returns the area it covered so the renderer can repaint
+    what was underneath before the next overlay is drawn.
+    """
+
+    def __init__(self, font_size=16):
+        self.font = pygame.font.SysFont('monospace', font_size)
+        self.surface = None
+        self.rect = None
+
+    def lines(self, profiler):
+        snap = profiler.snapshot()
+        rates, counters = snap['rates'], snap['counters']
+        lines = [f"{rates.get('ticks_per_s', 0):8.0f} ticks/s {rates.get('frames_per_s', 0):5.0f} fps "
+                 f"{rates.get('q_updates_per_s', 0):8.0f} q/s",
+                 f"{'phase':10}{'p50':>8}{'p95':>8}{'p99':>8} ms"]
+        for name, row in snap['phases'].items():
+            lines.append(f"{name:10}{row['p50_ms']:8.2f}{row['p95_ms']:8.2f}{row['p99_ms']:8.2f}")
+        if 'q_states_humans' in counters:
+            lines.append(f"Q humans {counters['q_states_visited_humans']}/{counters['q_states_humans']} "
+                         f"tigers {counters['q_states_visited_tigers']}/{counters['q_states_tigers']}")
+        if 'q_bytes_humans' in counters:
+            lines.append(f"Q memory {(counters['q_bytes_humans'] + counters['q_bytes_tigers']) / 2 ** 20:.1f} MB "
+                         f"hit {counters['q_hit_rate_humans']:.0%}/{counters['q_hit_rate_tigers']:.0%}")
+        return lines
+
+    def refresh(self, profiler):
+        rendered = [self.font.render(line, True, HUD_COLOR) for line in self.lines(profiler)]
+        width = max(s.get_width() for s in rendered) + 8
+        height = sum(s.get_height() for s in rendered) + 8
+        self.surface = pygame.Surface((width, height))
+        self.surface.fill(HUD_BACKGROUND)
+        y = 4
+        for s in rendered:
+            self.surface.blit(s, (4, y))
+            y += s.get_height()
+
+    def draw(self, window):
+        if self.surface is None:
+            return
+        self.rect = window.blit(self.surface, (0, 0))
+        pygame.display.update(self.rect)
+
+    def expose(self):
+        rect, self.rect = self.rect, None
+        return rect
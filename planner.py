@@ -0,0 +1,97 @@
+import random
+
+from constants import ALL_ACTIONS, EDGE_ACTIONS
+from world import manhattan
+
+# Leaf evaluation, from the humans' side: food scored, lives left, the game's outcome
+LIFE_VALUE = 30
+RESULT_VALUE = {'win': 500, 'lose': -500, 'timeout': 0, None: 0}
+
+
+def evaluate(world):
+    # How well the humans are doing; tigers maximise the negation. Between
+    # outcomes, humans prefer keeping their distance from the nearest tiger.
+    value = world.score + LIFE_VALUE * world.lives + RESULT_VALUE[world.result]
+    gw = world.grid_w
+    tigers = [divmod(c, gw) for c in world.t_cell]
+    for h in world.h_cell:
+        if h >= 0 and tigers:
+            value += 0.1 * manhattan(*divmod(h, gw), tigers)
+    return value
+
+
+class RolloutController:
+    """Picks moves for one side by Monte Carlo rollouts on forked worlds.
+
+    For every agent of its side that is due next tick, each candidate move
+    is tried `rollouts` times: the world is restored from the root, that
+    agent makes the move while everyone else steers as usual, and the game
+    runs `depth` more ticks before evaluate() scores it. The agent's own
+    built-in step is scored first and a candidate must beat it, so moves
+    the horizon cannot tell apart leave the agent on its usual course.
+    Agents are decided one at a time with the earlier ones' choices fixed.
+    Rollouts differ only in where the power-up lands; rollout k draws from
+    the same seed for every candidate, so candidates are compared on equal
+    luck and a few rollouts are enough.
+    """
+
+    def __init__(self, tigers=True, rollouts=4, depth=30, seed=None):
+        self.tigers = tigers
+        self.candidates = EDGE_ACTIONS if tigers else ALL_ACTIONS
+        self.rollouts = rollouts
+        self.depth = depth
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.rng = random.Random()
+        self.decisions = 0
+        self.scratch = None
+        self.forks = 0
+
+    def moves(self, world):
+        # {slot: move} for this side's agents due next tick
+        due = world.due(self.tigers)
+        if not due:
+            return {}
+        if self.scratch is None:
+            self.scratch = world.copy()
+        sign = -1 if self.tigers else 1
+        chosen = {}
+        self.decisions += 1
+        for slot in due:
+            best, best_move = None, None
+            for move in [None] + self.candidates:
+                if move is None:
+                    chosen.pop(slot, None)
+                else:
+                    chosen[slot] = move
+                total = sum(sign * self.rollout(world, chosen, k) for k in range(self.rollouts))
+                if best is None or total > best:
+                    best, best_move = total, move
+            if best_move is None:
+                chosen.pop(slot, None)
+            else:
+                chosen[slot] = best_move
+        return chosen
+
+    def rollout(self, root, chosen, k):
+        sim = self.scratch
+        sim.restore(root)
+        self.forks += 1
+        rng = self.rng
+        rng.seed(self.seed * 1000003 + self.decisions * 101 + k)
+        if self.tigers:
+            sim.step(rng, tiger_moves=chosen)
+        else:
+            sim.step(rng, human_moves=chosen)
+        for _ in range(self.depth):
+            if sim.step(rng):
+                break
+        return evaluate(sim)
+
+
+def play(world, rng, tiger_controller=None, human_controller=None):
+    # Play a World to the end; controllers (if any) choose their side's moves each tick
+    while not world.done:
+        tiger_moves = tiger_controller.moves(world) if tiger_controller is not None else None
+        human_moves = human_controller.moves(world) if human_controller is not None else None
+        world.step(rng, tiger_moves, human_moves)
+    return world.result
@@ -0,0 +1,399 @@
+import os
+import queue
+import random
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+from constants import ALL_ACTIONS
+
+ACTION_INDEX = {a: i for i, a in enumerate(ALL_ACTIONS)}
+N_ACTIONS = len(ALL_ACTIONS)
+
+# States from make_human_state/make_tiger_state are 4 offsets in -2..2
+STATE_BASE = 5
+STATE_DIMS = 4
+N_STATES = STATE_BASE ** STATE_DIMS
+
+# Checkpoint layout: a 64-byte header followed by the raw little-endian arrays
+# q_humans (float32), visits_humans (int32), q_tigers, visits_tigers.
+# Bump STATE_ENCODING_VERSION whenever encode_state changes meaning.
+CHECKPOINT_MAGIC = b'TQTB'
+CHECKPOINT_VERSION = 1
+STATE_ENCODING_VERSION = 1
+HEADER = struct.Struct('<4sHHIIdddQQ')
+HEADER_SIZE = 64
+DEFAULT_CHECKPOINT = 'q_tables.qtb'
+
+# Python objects per stored state: its tuple (about 10 small ints) and its
+# row number; the budget assumes this size, nbytes() measures the real one
+KEY_OBJECT_BYTES = 160
+ROW_OBJECT_BYTES = 28
+
+
+def encode_state(state):
+    # (a, b, c, d) with every entry in -2..2 -> integer in 0..624
+    a, b, c, d = state
+    return (((a + 2) * 5 + (b + 2)) * 5 + (c + 2)) * 5 + (d + 2)
+
+
+def decode_state(index):
+    digits = []
+    for _ in range(STATE_DIMS):
+        index, r = divmod(index, STATE_BASE)
+        digits.append(r - 2)
+    return tuple(reversed(digits))
+
+
+class DictQTable:
+    """The original dict-of-dicts table, kept for comparison."""
+
+    def __init__(self, table=None):
+        self.table = table if table is not None else {}
+
+    def __len__(self):
+        return len(self.table)
+
+    def get(self, state, action):
+        if state not in self.table:
+            self.table[state] = {a: 0.0 for a in ALL_ACTIONS}
+        return self.table[state][action]
+
+    def choose(self, state, epsilon, rng=random, tie_rng=None):
+        if rng.random() < epsilon:
+            return rng.choice(ALL_ACTIONS)
+        q_values = self.table.get(state, {a: 0.0 for a in ALL_ACTIONS})
+        max_q = max(q_values.values())
+        best_actions = [a for a, q in q_values.items() if q == max_q]
+        return (tie_rng or rng).choice(best_actions)
+
+    def update(self, state, action, reward, next_state, next_action, alpha, gamma):
+        current_q = self.get(state, action)
+        next_q = self.get(next_state, next_action)
+        self.table[state][action] = current_q + alpha * (reward + gamma * next_q - current_q)
+
+
+class ArrayQTable:
+    """Dense float32 Q-table indexed by encode_state() and ACTION_INDEX."""
+
+    def __init__(self, n_states=N_STATES, n_actions=N_ACTIONS, q=None, visits=None):
+        # q/visits may be supplied, e.g. memory-mapped arrays from load_tables
+        self.q = q if q is not None else np.zeros((n_states, n_actions), dtype=np.float32)
+        self.visits = visits if visits is not None else np.zeros((n_states, n_actions), dtype=np.int32)
+        # Flat views make the scalar path a single C-level index per access
+        self.flat_q = self.q.reshape(-1)
+        self.flat_visits = self.visits.reshape(-1)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.visits.any(axis=1)))
+
+    def get(self, state, action):
+        return self.flat_q.item(encode_state(state) * N_ACTIONS + ACTION_INDEX[action])
+
+    def choose(self, state, epsilon, rng=random, tie_rng=None):
+        # rng drives exploration; tie_rng (default rng) breaks ties between equal Q-values
+        if rng.random() < epsilon:
+            return rng.choice(ALL_ACTIONS)
+        row = self.q[encode_state(state)].tolist()
+        max_q = max(row)
+        best = [i for i, q in enumerate(row) if q == max_q]
+        return ALL_ACTIONS[best[0] if len(best) == 1 else (tie_rng or rng).choice(best)]
+
+    def update(self, state, action, reward, next_state, next_action, alpha, gamma):
+        i = encode_state(state) * N_ACTIONS + ACTION_INDEX[action]
+        next_q = self.flat_q.item(encode_state(next_state) * N_ACTIONS + ACTION_INDEX[next_action])
+        current_q = self.flat_q.item(i)
+        self.flat_q[i] = current_q + alpha * (reward + gamma * next_q - current_q)
+        self.flat_visits[i] += 1
+
+    def greedy_batch(self, states, rng):
+        # Argmax per row; ties are broken uniformly by ranking tied entries with noise
+        q = self.q[states]
+        ties = q == q.max(axis=1, keepdims=True)
+        return np.argmax(ties * rng.random(q.shape), axis=1)
+
+    def choose_batch(self, states, epsilon, rng):
+        # Epsilon-greedy action indices for an int array of encoded states
+        actions = self.greedy_batch(states, rng)
+        explore = rng.random(len(states)) < epsilon
+        actions[explore] = rng.integers(0, self.q.shape[1], int(explore.sum()))
+        return actions
+
+    def update_batch(self, states, actions, rewards, next_states, next_actions, alpha, gamma):
+        # SARSA over encoded arrays. Repeated (s, a) pairs in one batch take the
+        # mean of their deltas so a large batch cannot overshoot the target.
+        n_actions = self.q.shape[1]
+        current = self.q[states, actions]
+        target = rewards + gamma * self.q[next_states, next_actions]
+        flat = states * n_actions + actions
+        counts = np.bincount(flat, minlength=self.flat_q.size)
+        sums = np.bincount(flat, weights=alpha * (target - current), minlength=self.flat_q.size)
+        hit = np.flatnonzero(counts)
+        self.flat_q[hit] += (sums[hit] / counts[hit]).astype(np.float32)
+        self.flat_visits[hit] += counts[hit].astype(np.int32)
+
+
+class BoundedQTable:
+    """Q-values for any hashable states within a fixed memory budget.
+
+    Each state is keyed by the state tuple itself, so distinct states never
+    share a row. Keys map to rows of q/visits arrays that double as needed
+    up to the number of rows `budget` bytes can hold. When every row is
+    taken, the eighth with the least claim to stay is evicted in one pass:
+    least recently used rows for policy 'lru', least visited (then least
+    recent) for 'visits'. Reads of unknown states return 0.0 without taking
+    a row; only update() inserts.
+    """
+
+    # Dict slot plus the state tuple and row objects, per stored state (CPython, approximate)
+    ENTRY_OVERHEAD = 48 + KEY_OBJECT_BYTES
+    POLICIES = ('lru', 'visits')
+
+    def __init__(self, budget=64 << 20, policy='lru', n_actions=N_ACTIONS):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy!r}; expected one of {', '.join(self.POLICIES)}")
+        self.budget = budget
+        self.policy = policy
+        row_bytes = n_actions * 8 + 16 + self.ENTRY_OVERHEAD
+        self.capacity = budget // row_bytes
+        if self.capacity < 8:
+            raise ValueError(f"A budget of {budget} bytes holds fewer than 8 states")
+        rows = min(self.capacity, 1024)
+        self.q = np.zeros((rows, n_actions), dtype=np.float32)
+        self.visits = np.zeros((rows, n_actions), dtype=np.int32)
+        self.used = np.zeros(rows, dtype=np.int64)  # clock at last touch
+        self.keys = [None] * rows  # the state held by each row
+        self.key_bytes = 0
+        self.rows = {}
+        self.free = []
+        self.size = 0  # rows ever handed out; freed rows are reused first
+        self.clock = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def find(self, state):
+        # Row of a known state (refreshing its recency), or None; counted as a hit or miss
+        row = self.rows.get(state)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.clock += 1
+        self.used[row] = self.clock
+        return row
+
+    def insert(self, state):
+        if self.free:
+            row = self.free.pop()
+        elif self.size < self.capacity:
+            if self.size == len(self.q):
+                self.grow(min(2 * self.size, self.capacity))
+            row = self.size
+            self.size += 1
+        else:
+            self.evict()
+            row = self.free.pop()
+        self.rows[state] = row
+        self.keys[row] = state
+        self.key_bytes += sys.getsizeof(state)
+        self.clock += 1
+        self.used[row] = self.clock
+        return row
+
+    def grow(self, rows):
+        for name in ('q', 'visits', 'used'):
+            old = getattr(self, name)
+            new = np.zeros((rows,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self.keys.extend([None] * (rows - len(self.keys)))
+
+    def evict(self):
+        count = max(1, self.capacity // 8)
+        if self.policy == 'lru':
+            rows = np.argpartition(self.used, count - 1)[:count]
+        else:
+            rows = np.lexsort((self.used, self.visits.sum(axis=1)))[:count]
+        for row in rows.tolist():
+            key = self.keys[row]
+            del self.rows[key]
+            self.keys[row] = None
+            self.key_bytes -= sys.getsizeof(key)
+        self.q[rows] = 0.0
+        self.visits[rows] = 0
+        self.free = rows.tolist()
+        self.evictions += count
+
+    def get(self, state, action):
+        row = self.find(state)
+        return 0.0 if row is None else self.q.item(row, ACTION_INDEX[action])
+
+    def choose(self, state, epsilon, rng=random, tie_rng=None):
+        if rng.random() < epsilon:
+            return rng.choice(ALL_ACTIONS)
+        row = self.find(state)
+        if row is None:
+            return (tie_rng or rng).choice(ALL_ACTIONS)
+        values = self.q[row].tolist()
+        max_q = max(values)
+        best = [i for i, q in enumerate(values) if q == max_q]
+        return ALL_ACTIONS[best[0] if len(best) == 1 else (tie_rng or rng).choice(best)]
+
+    def update(self, state, action, reward, next_state, next_action, alpha, gamma):
+        next_q = self.get(next_state, next_action)
+        row = self.find(state)
+        if row is None:
+            row = self.insert(state)
+        a = ACTION_INDEX[action]
+        current_q = self.q.item(row, a)
+        self.q[row, a] = current_q + alpha * (reward + gamma * next_q - current_q)
+        self.visits[row, a] += 1
+
+    def nbytes(self):
+        # Bytes held now: the row arrays plus the key index and the state tuples in it
+        arrays = self.q.nbytes + self.visits.nbytes + self.used.nbytes + sys.getsizeof(self.keys)
+        return arrays + sys.getsizeof(self.rows) + self.key_bytes + len(self.rows) * ROW_OBJECT_BYTES
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'states': len(self.rows), 'capacity': self.capacity, 'bytes': self.nbytes(), 'budget': self.budget,
+                'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions}
+
+
+Q_BACKENDS = {'dict': DictQTable, 'array': ArrayQTable, 'bounded': BoundedQTable}
+
+
+def make_q_table(backend='array', **options):
+    # options go to the backend, e.g. make_q_table('bounded', budget=256 << 20, policy='visits')
+    if backend not in Q_BACKENDS:
+        raise ValueError(f"Unknown Q-table backend: {backend}")
+    return Q_BACKENDS[backend](**options)
+
+
+def save_tables(path, q_humans, q_tigers, alpha, gamma, epsilon):
+    # Write to a temp file in the same directory and rename over the target,
+    # so readers only ever see a complete checkpoint
+    n_states, n_actions = q_humans.q.shape
+    header = HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, STATE_ENCODING_VERSION, n_states, n_actions,
+                         alpha, gamma, epsilon, int(q_humans.visits.sum()), int(q_tigers.visits.sum()))
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            for table in (q_humans, q_tigers):
+                f.write(np.ascontiguousarray(table.q, dtype='<f4').tobytes())
+                f.write(np.ascontiguousarray(table.visits, dtype='<i4').tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        # e.g. a full disk: leave no half-written temp file behind
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"{path} is not a Q-table checkpoint")
+    (magic, version, encoding, n_states, n_actions, alpha, gamma, epsilon,
+     visits_humans, visits_tigers) = HEADER.unpack_from(raw)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is not a Q-table checkpoint")
+    if encoding != STATE_ENCODING_VERSION:
+        raise ValueError(f"{path} uses state encoding v{encoding}, expected v{STATE_ENCODING_VERSION}")
+    return {'n_states': n_states, 'n_actions': n_actions, 'alpha': alpha, 'gamma': gamma, 'epsilon': epsilon,
+            'visits_humans': visits_humans, 'visits_tigers': visits_tigers}
+
+
+def load_tables(path, mmap=True):
+    # Returns (q_humans, q_tigers, header). With mmap the arrays are copy-on-write
+    # views of the file: opening is instant and training never writes back to it.
+    header = read_header(path)
+    shape = (header['n_states'], header['n_actions'])
+    size = shape[0] * shape[1] * 4
+    tables = []
+    for i in range(2):
+        q_offset = HEADER_SIZE + i * 2 * size
+        if mmap:
+            q = np.memmap(path, dtype='<f4', mode='c', offset=q_offset, shape=shape)
+            visits = np.memmap(path, dtype='<i4', mode='c', offset=q_offset + size, shape=shape)
+        else:
+            q = np.fromfile(path, dtype='<f4', count=shape[0] * shape[1], offset=q_offset).reshape(shape)
+            visits = np.fromfile(path, dtype='<i4', count=shape[0] * shape[1], offset=q_offset + size).reshape(shape)
+        tables.append(ArrayQTable(q=q, visits=visits))
+    return tables[0], tables[1], header
+
+
+class Autosaver:
+    """Periodic checkpointing that never blocks the caller.
+
+    maybe_save() only snapshots the tables (a ~40 KB copy) and hands them to a
+    background thread that does the file I/O. A snapshot is skipped while an
+    earlier one is still queued behind a write in progress. A failed write
+    is printed and kept in `error` (None after the next good one), and the
+    writer carries on with later snapshots.
+    """
+
+    def __init__(self, path, interval=30.0):
+        self.path = path
+        self.interval = interval
+        self.last_save = time.monotonic()
+        self.pending = queue.Queue(maxsize=1)
+        self.error = None
+        self.thread = threading.Thread(target=self.writer, daemon=True)
+        self.thread.start()
+
+    def maybe_save(self, q_humans, q_tigers, alpha, gamma, epsilon, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_save < self.interval:
+            return False
+        snapshot = (ArrayQTable(q=np.array(q_humans.q), visits=np.array(q_humans.visits)),
+                    ArrayQTable(q=np.array(q_tigers.q), visits=np.array(q_tigers.visits)),
+                    alpha, gamma, epsilon)
+        if force:
+            # A forced save (e.g. on exit) waits for room rather than being dropped
+            if not self.hand_over(snapshot):
+                return False
+        else:
+            try:
+                self.pending.put_nowait(snapshot)
+            except queue.Full:
+                return False
+        self.last_save = now
+        return True
+
+    def hand_over(self, item):
+        # Wait for room in the queue, unless the writer thread is gone and never will make any
+        while self.thread.is_alive():
+            try:
+                self.pending.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def writer(self):
+        while True:
+            snapshot = self.pending.get()
+            if snapshot is None:
+                return
+            try:
+                save_tables(self.path, *snapshot)
+                self.error = None
+            except OSError as e:
+                self.error = e
+                print(f"autosave to {self.path} failed: {e}", file=sys.stderr)
+
+    def close(self):
+        # Waits for the last queued snapshot to reach disk
+        if self.hand_over(None):
+            self.thread.join()
@@ -0,0 +1,189 @@
+import pygame
+
+from constants import COLORS
+
+GRID_COLOR = (220, 220, 220)
+BACKGROUND = (255, 255, 255)
+WALL_COLOR = (90, 90, 90)
+
+# Cell contents as bits, drawn lowest bit first (food under tigers under humans)
+FOOD, POWER, TIGER, HUMAN = 1, 2, 4, 8
+LAYERS = (FOOD, POWER, TIGER, HUMAN)
+
+
+def agent_positions(sim):
+    # Every agent's cell keyed by kind and agent ID, for interpolating the next frame
+    return {TIGER: sim.tigers.positions_by_id(), HUMAN: sim.humans.positions_by_id()}
+
+
+class Renderer:
+    """Draws a Simulation by repainting only what changed.
+
+    The grid lines, walls and safe zones are rendered once into a background
+    surface, and every sprite once per cell size. Food and power-ups are
+    kept on a static layer that is patched cell by cell. Agents are drawn
+    on top at (possibly interpolated) pixel positions. Each frame only the
+    rects of changed static cells and of agents that appeared, moved or
+    vanished are repainted and passed to pygame.display.update.
+    """
+
+    def __init__(self, window, grid_w, grid_h, cell_size, safe_zones, obstacles=()):
+        self.window = window
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.safe_zones = safe_zones
+        self.obstacles = obstacles
+        self.resize(cell_size)
+
+    def resize(self, cell_size):
+        self.cell_size = cell_size
+        self.background = self.render_background()
+        self.sprites = {kind: self.render_sprite(kind) for kind in LAYERS}
+        self.invalidate()
+
+    def invalidate(self):
+        # Forget what is on screen; the next draw repaints everything
+        self.scene = None
+        self.agents = None
+        self.exposed = []
+
+    def expose(self, rect):
+        # Something else drew over rect; repaint it on the next draw
+        if rect is not None:
+            self.exposed.append(pygame.Rect(rect))
+
+    def render_background(self):
+        cs = self.cell_size
+        surface = pygame.Surface((self.grid_w * cs, self.grid_h * cs)).convert()
+        surface.fill(BACKGROUND)
+
+        # Draw safe zones as bold green squares
+        for sx, sy in self.safe_zones:
+            pygame.draw.rect(surface, COLORS['power'], pygame.Rect(sy * cs, sx * cs, cs, cs), 4)
+
+        for ox, oy in self.obstacles:
+            surface.fill(WALL_COLOR, pygame.Rect(oy * cs, ox * cs, cs, cs))
+
+        # Draw grid lines
+        for i in range(self.grid_w + 1):
+            pygame.draw.line(surface, GRID_COLOR, (i * cs, 0), (i * cs, self.grid_h * cs))
+        for j in range(self.grid_h + 1):
+            pygame.draw.line(surface, GRID_COLOR, (0, j * cs), (self.grid_w * cs, j * cs))
+        return surface
+
+    def render_sprite(self, kind):
+        cs = self.cell_size
+        surface = pygame.Surface((cs, cs), pygame.SRCALPHA)
+        quarter = pygame.Rect(cs // 4, cs // 4, cs // 2, cs // 2)
+        c = cs // 2
+        if kind == FOOD:
+            pygame.draw.ellipse(surface, COLORS['food'], quarter)
+        elif kind == POWER:
+            pygame.draw.rect(surface, COLORS['power'], quarter)
+        elif kind == TIGER:
+            # Tigers are circles
+            pygame.draw.circle(surface, COLORS['tiger'], (c, c), cs // 2 - 2)
+        else:
+            # Humans are stickmen (simple lines)
+            color = COLORS['human']
+            r = cs // 6
+            pygame.draw.circle(surface, color, (c, c - r), r)
+            pygame.draw.line(surface, color, (c, c - r // 2), (c, c + r), 2)
+            pygame.draw.line(surface, color, (c - r, c), (c + r, c), 2)
+            pygame.draw.line(surface, color, (c, c + r), (c - r, c + 2 * r), 2)
+            pygame.draw.line(surface, color, (c, c + r), (c + r, c + 2 * r), 2)
+        return surface
+
+    def build_scene(self, sim):
+        scene = {}
+        for pos in sim.food_list:
+            scene[pos] = FOOD
+        if sim.power_up is not None:
+            scene[sim.power_up] = scene.get(sim.power_up, 0) | POWER
+        return scene
+
+    def agent_sprites(self, sim, prev, alpha):
+        # (kind, x, y) pixel positions, tigers first so humans draw on top.
+        # prev is agent_positions() from before the latest tick.
+        cs = self.cell_size
+        sprites = []
+        for kind, agents in ((TIGER, sim.tigers), (HUMAN, sim.humans)):
+            before = prev[kind] if prev is not None and alpha < 1 else None
+            for agent, x, y in zip(agents.views, agents.x, agents.y):
+                if before is not None:
+                    px, py = before.get(agent.id, (x, y))
+                    x, y = px + (x - px) * alpha, py + (y - py) * alpha
+                sprites.append((kind, round(y * cs), round(x * cs)))
+        return sprites
+
+    def draw(self, sim, prev=None, alpha=1.0):
+        scene = self.build_scene(sim)
+        agents = self.agent_sprites(sim, prev, alpha)
+        cs = self.cell_size
+
+        if self.scene is None:
+            self.static = self.background.copy()
+            for cell, mask in scene.items():
+                self.draw_cell(cell, mask)
+            self.window.blit(self.static, (0, 0))
+            for kind, px, py in agents:
+                self.window.blit(self.sprites[kind], (px, py))
+            self.scene, self.agents, self.exposed = scene, agents, []
+            self.present(None)
+            return
+
+        # Patch static cells that changed, then erase agents that moved or vanished
+        old = self.scene
+        erase = [self.draw_cell(cell, scene.get(cell, 0))
+                 for cell in old.keys() | scene.keys() if old.get(cell) != scene.get(cell)]
+        current = set(agents)
+        erase.extend(pygame.Rect(px, py, cs, cs) for kind, px, py in self.agents if (kind, px, py) not in current)
+        erase.extend(self.exposed)
+        self.exposed = []
+        previous = set(self.agents)
+        added = [pygame.Rect(px, py, cs, cs) for kind, px, py in agents if (kind, px, py) not in previous]
+        for rect in erase:
+            self.window.blit(self.static, rect, rect)
+
+        # Redraw, in order, every agent overlapping a repainted area
+        dirty_cells = set()
+        for rect in erase + added:
+            dirty_cells.update(self.cells_in(rect))
+        for kind, px, py in agents:
+            if not dirty_cells.isdisjoint(self.cells_under(px, py)):
+                self.window.blit(self.sprites[kind], (px, py))
+
+        self.scene, self.agents = scene, agents
+        if erase or added:
+            self.present(erase + added)
+
+    def present(self, rects):
+        # Push the frame to the screen: everything if rects is None, else just rects
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def cells_under(self, px, py):
+        # Grid cells touched by a cell-sized rect at pixel (px, py)
+        cs = self.cell_size
+        col, row = px // cs, py // cs
+        cols = (col, col + 1) if px % cs else (col,)
+        rows = (row, row + 1) if py % cs else (row,)
+        return [(r, c) for r in rows for c in cols]
+
+    def cells_in(self, rect):
+        # Grid cells overlapped by an arbitrary pixel rect
+        cs = self.cell_size
+        return [(r, c) for r in range(rect.top // cs, (rect.bottom - 1) // cs + 1)
+                for c in range(rect.left // cs, (rect.right - 1) // cs + 1)]
+
+    def draw_cell(self, cell, mask):
+        # Repaint one cell of the static layer and return its rect
+        cs = self.cell_size
+        rect = pygame.Rect(cell[1] * cs, cell[0] * cs, cs, cs)
+        self.static.blit(self.background, rect, rect)
+        for kind in (FOOD, POWER):
+            if mask & kind:
+                self.static.blit(self.sprites[kind], rect)
+        return rect
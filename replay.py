@@ -0,0 +1,516 @@
+import argparse
+import os
+import struct
+import time
+from bisect import bisect_right
+
+from agents import AgentStore
+from constants import COLORS
+from simulation import corner_cells
+
+# File layout: HEADER, the wall cells (a count, then the sorted cells), a
+# keyframe for tick 0, then one record per tick (a flags byte and the
+# sections it announces, optionally followed by a keyframe of the state
+# after that tick), then the keyframe index and FOOTER. Integers are
+# unsigned LEB128 varints; cells are x * grid_w + y. Version 1 files have
+# no wall list.
+REPLAY_MAGIC = b'TRPL'
+REPLAY_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+HEADER = struct.Struct('<4sHHIIQI')
+FOOTER = struct.Struct('<QQ4s')
+FOOTER_MAGIC = b'REND'
+KEYFRAME_EVERY = 100
+
+# Tick record flags
+TIGER_MOVES, CAUGHT, HUMAN_MOVES, EVENTS, KEYFRAME = 1, 2, 4, 8, 16
+
+EVENT_CODES = {'food': 0, 'catch': 1, 'power_spawn': 2, 'power_pickup': 3, 'power_end': 4, 'done': 5}
+EVENT_NAMES = {code: name for name, code in EVENT_CODES.items()}
+RESULT_CODES = {'win': 0, 'lose': 1, 'timeout': 2}
+RESULT_NAMES = {code: name for name, code in RESULT_CODES.items()}
+
+
+def write_varint(out, n):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def read_varint(data, pos):
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def zigzag(n):
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def unzigzag(n):
+    return n >> 1 if not n & 1 else -(n >> 1) - 1
+
+
+def move_code(old, new):
+    # One-step moves (including standing still) as 0..8
+    dx, dy = new[0] - old[0], new[1] - old[1]
+    if abs(dx) > 1 or abs(dy) > 1:
+        raise ValueError(f"Agent jumped from {old} to {new}")
+    return (dx + 1) * 3 + dy + 1
+
+
+def write_moves(out, old, new):
+    # Only agents that moved: the gap since the previous moved index, times 9, plus the move
+    moved = [(i, move_code(a, b)) for i, (a, b) in enumerate(zip(old, new)) if a != b]
+    write_varint(out, len(moved))
+    last = -1
+    for i, code in moved:
+        write_varint(out, (i - last - 1) * 9 + code)
+        last = i
+    return bool(moved)
+
+
+class TickEncoder:
+    """Delta-encodes a Simulation tick by tick in the replay record format.
+
+    Call encode(events) after every Simulation.step() with the events it
+    returned. Per tick only the agents that moved are written, as a one-byte
+    move code after a varint index gap, followed by caught humans and the
+    game events; an idle tick costs one byte. A keyframe of the full state
+    can be appended to any record, or written on its own.
+    """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.grid_w = sim.grid_w
+        self.resync()
+
+    def cell(self, pos):
+        return pos[0] * self.grid_w + pos[1]
+
+    def resync(self):
+        # Start the deltas from the simulation's current state, e.g. after a reset
+        self.tick = self.sim.tick
+        self.snapshot()
+
+    def snapshot(self):
+        # Agents are numbered by ID order, which catches never reshuffle
+        self.tigers = list(self.sim.tigers.positions_by_id().values())
+        self.humans = self.sim.humans.positions_by_id()
+
+    def write_keyframe(self, out):
+        sim = self.sim
+        for n in (sim.tick, sim.score, zigzag(sim.lives), int(sim.power_active),
+                  self.cell(sim.power_up) + 1 if sim.power_up is not None else 0,
+                  RESULT_CODES[sim.result] + 1 if sim.result is not None else 0):
+            write_varint(out, n)
+        for agents in (sim.tigers, sim.humans):
+            write_varint(out, len(agents))
+            for pos in agents.positions_by_id().values():
+                write_varint(out, self.cell(pos))
+        food = sorted(self.cell(p) for p in sim.food_list)
+        write_varint(out, len(food))
+        last = 0
+        for c in food:
+            write_varint(out, c - last)
+            last = c
+
+    def encode(self, events, keyframe=False):
+        # The record for the tick just played, or None if step() did nothing
+        # (a finished game). With keyframe, the state after the tick follows
+        # the record, starting at self.keyframe_at.
+        sim = self.sim
+        if sim.tick == self.tick:
+            return None
+        if sim.tick != self.tick + 1:
+            raise ValueError(f"Encoder missed ticks {self.tick + 1}..{sim.tick - 1}")
+        self.tick = sim.tick
+
+        out = bytearray(1)
+        flags = 0
+        if write_moves(out, self.tigers, list(sim.tigers.positions_by_id().values())):
+            flags |= TIGER_MOVES
+        else:
+            del out[1:]
+
+        # Humans only ever leave by being caught; survivors keep their ID order
+        humans = sim.humans.positions_by_id()
+        caught = [i for i, agent_id in enumerate(self.humans) if agent_id not in humans]
+        if caught:
+            flags |= CAUGHT
+            write_varint(out, len(caught))
+            last = -1
+            for i in caught:
+                write_varint(out, i - last - 1)
+                last = i
+        before = [p for agent_id, p in self.humans.items() if agent_id in humans]
+        mark = len(out)
+        if write_moves(out, before, list(humans.values())):
+            flags |= HUMAN_MOVES
+        else:
+            del out[mark:]
+
+        if events:
+            flags |= EVENTS
+            write_varint(out, len(events))
+            for kind, data in events:
+                write_varint(out, EVENT_CODES[kind])
+                if kind == 'food':
+                    write_varint(out, self.cell(data))
+                    write_varint(out, sim.score)
+                elif kind == 'catch':
+                    write_varint(out, self.cell(data))
+                    write_varint(out, zigzag(sim.lives))
+                elif kind in ('power_spawn', 'power_pickup'):
+                    write_varint(out, self.cell(data))
+                elif kind == 'done':
+                    write_varint(out, RESULT_CODES[data])
+
+        self.keyframe_at = None
+        if keyframe:
+            flags |= KEYFRAME
+            self.keyframe_at = len(out)
+            self.write_keyframe(out)
+        out[0] = flags
+        self.snapshot()
+        return out
+
+
+class ReplayRecorder:
+    """Appends a game to a replay file one tick at a time.
+
+    Call record(events) after every Simulation.step() with the events it
+    returned; ticks are encoded by a TickEncoder. Every keyframe_every
+    ticks the full state is written too, so a player can seek without
+    replaying from the start.
+    """
+
+    def __init__(self, path, sim, keyframe_every=KEYFRAME_EVERY):
+        self.sim = sim
+        self.keyframe_every = keyframe_every
+        self.encoder = TickEncoder(sim)
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, 0, sim.grid_w, sim.grid_h, sim.seed,
+                                    keyframe_every))
+        out = bytearray()
+        walls = sorted(self.encoder.cell(pos) for pos in sim.obstacles)
+        write_varint(out, len(walls))
+        for c in walls:
+            write_varint(out, c)
+        self.file.write(out)
+        self.index = [(sim.tick, self.file.tell())]
+        out = bytearray()
+        self.encoder.write_keyframe(out)
+        self.file.write(out)
+
+    @property
+    def tick(self):
+        return self.encoder.tick
+
+    def record(self, events):
+        sim = self.sim
+        out = self.encoder.encode(events, sim.tick % self.keyframe_every == 0 or sim.done)
+        if out is None:
+            return
+        if self.encoder.keyframe_at is not None:
+            self.index.append((sim.tick, self.file.tell() + self.encoder.keyframe_at))
+        self.file.write(out)
+
+    def close(self):
+        if self.file.closed:
+            return
+        out = bytearray()
+        write_varint(out, len(self.index))
+        last_tick = last_offset = 0
+        for tick, offset in self.index:
+            write_varint(out, tick - last_tick)
+            write_varint(out, offset - last_offset)
+            last_tick, last_offset = tick, offset
+        index_offset = self.file.tell()
+        self.file.write(out)
+        self.file.write(FOOTER.pack(index_offset, self.tick, FOOTER_MAGIC))
+        self.file.close()
+
+
+class ReplayPlayer:
+    """Reconstructs a recorded game tick by tick.
+
+    Exposes the same attributes the Renderer reads from a Simulation
+    (tigers, humans, food_list, power_up, safe_zones) plus tick, score,
+    lives, power_active, done and result. seek() jumps to the nearest
+    keyframe at or before the target and applies the few ticks after it.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path} is not a replay")
+        magic, version, _, self.grid_w, self.grid_h, self.seed, self.keyframe_every = HEADER.unpack_from(self.data)
+        if magic != REPLAY_MAGIC or version not in READABLE_VERSIONS:
+            raise ValueError(f"{path} is not a replay")
+        self.safe_zones = corner_cells(self.grid_w, self.grid_h)
+        self.start = HEADER.size
+        self.obstacles = []
+
+        footer = self.data[-FOOTER.size:] if len(self.data) >= HEADER.size + FOOTER.size else b''
+        if footer[-4:] == FOOTER_MAGIC:
+            self.read_walls(version)
+            index_offset, self.last_tick, _ = FOOTER.unpack(footer)
+            self.end = index_offset
+            self.index = self.read_index(index_offset)
+        else:
+            # Unfinished recording (or one cut anywhere, footer included):
+            # index it by playing it through once up to the last complete tick
+            self.end = len(self.data)
+            self.index = []
+            try:
+                self.read_walls(version)
+                self.load_keyframe(self.start)
+            except (IndexError, KeyError, ValueError):
+                raise ValueError(f"{path}: truncated or not a replay") from None
+            while True:
+                start, tick = self.pos, self.tick
+                try:
+                    # Nothing follows the record that ends the game but the index
+                    if self.step() is None or self.done:
+                        break
+                except (IndexError, KeyError, ValueError, struct.error):
+                    # Drop the incomplete (or unparseable) final record, keyframe included
+                    self.end, self.tick = start, tick
+                    break
+            self.last_tick = self.tick
+        self.index_ticks = [tick for tick, _ in self.index]
+        self.seek(0)
+
+    def read_walls(self, version):
+        # Version 2 lists the wall cells between the header and the first keyframe
+        if version >= 2:
+            count, self.start = read_varint(self.data, self.start)
+            for _ in range(count):
+                cell, self.start = read_varint(self.data, self.start)
+                self.obstacles.append(self.position(cell))
+
+    def read_index(self, pos):
+        count, pos = read_varint(self.data, pos)
+        index = []
+        tick = offset = 0
+        for _ in range(count):
+            dt, pos = read_varint(self.data, pos)
+            do, pos = read_varint(self.data, pos)
+            tick, offset = tick + dt, offset + do
+            index.append((tick, offset))
+        return index
+
+    def position(self, cell):
+        return divmod(cell, self.grid_w)
+
+    def load_keyframe(self, pos):
+        data = self.data
+        keyframe = pos
+        values = []
+        for _ in range(6):
+            n, pos = read_varint(data, pos)
+            values.append(n)
+        self.tick, self.score, lives, power_active, power_up, result = values
+        if not self.index or self.index[-1][0] < self.tick:
+            self.index.append((self.tick, keyframe))
+        self.lives = unzigzag(lives)
+        self.power_active = bool(power_active)
+        self.power_up = self.position(power_up - 1) if power_up else None
+        agents = []
+        for kind in ('tiger', 'human'):
+            count, pos = read_varint(data, pos)
+            group = AgentStore(kind, COLORS[kind])
+            for _ in range(count):
+                cell, pos = read_varint(data, pos)
+                group.add(*self.position(cell))
+            agents.append(group)
+        self.tigers, self.humans = agents
+        count, pos = read_varint(data, pos)
+        self.food = set()
+        cell = 0
+        for _ in range(count):
+            gap, pos = read_varint(data, pos)
+            cell += gap
+            self.food.add(self.position(cell))
+        self.result = RESULT_NAMES[result - 1] if result else None
+        self.done = self.result is not None
+        self.pos = pos
+
+    @property
+    def food_list(self):
+        return self.food
+
+    def seek(self, tick):
+        tick = max(0, min(tick, self.last_tick))
+        i = bisect_right(self.index_ticks, tick) - 1
+        self.load_keyframe(self.index[i][1])
+        while self.tick < tick:
+            self.step()
+
+    def read_moves(self, pos, store):
+        # Moved agents are numbered by their place in ID order
+        agents = store.by_id()
+        count, pos = read_varint(self.data, pos)
+        i = -1
+        for _ in range(count):
+            n, pos = read_varint(self.data, pos)
+            gap, code = divmod(n, 9)
+            i += gap + 1
+            dx, dy = divmod(code, 3)
+            agents[i].x += dx - 1
+            agents[i].y += dy - 1
+        return pos
+
+    def step(self):
+        # Apply the next tick; returns its events, or None at the end of the replay
+        if self.pos >= self.end:
+            return None
+        data = self.data
+        flags, pos = data[self.pos], self.pos + 1
+        if flags >= KEYFRAME << 1:
+            raise ValueError(f"Bad tick record flags {flags:#x}")
+        if flags & TIGER_MOVES:
+            pos = self.read_moves(pos, self.tigers)
+        if flags & CAUGHT:
+            count, pos = read_varint(data, pos)
+            caught, i = [], -1
+            for _ in range(count):
+                gap, pos = read_varint(data, pos)
+                i += gap + 1
+                caught.append(i)
+            humans = self.humans.by_id()
+            for i in caught:
+                self.humans.remove(humans[i])
+        if flags & HUMAN_MOVES:
+            pos = self.read_moves(pos, self.humans)
+
+        events = []
+        if flags & EVENTS:
+            count, pos = read_varint(data, pos)
+            for _ in range(count):
+                code, pos = read_varint(data, pos)
+                kind = EVENT_NAMES[code]
+                value = None
+                if kind in ('food', 'catch', 'power_spawn', 'power_pickup'):
+                    cell, pos = read_varint(data, pos)
+                    value = self.position(cell)
+                if kind == 'food':
+                    self.score, pos = read_varint(data, pos)
+                    self.food.discard(value)
+                elif kind == 'catch':
+                    lives, pos = read_varint(data, pos)
+                    self.lives = unzigzag(lives)
+                elif kind == 'power_spawn':
+                    self.power_up = value
+                elif kind == 'power_pickup':
+                    self.power_up = None
+                    self.power_active = True
+                elif kind == 'power_end':
+                    self.power_active = False
+                elif kind == 'done':
+                    result, pos = read_varint(data, pos)
+                    self.done, self.result = True, RESULT_NAMES[result]
+                    value = self.result
+                events.append((kind, value))
+
+        self.tick += 1
+        self.pos = pos
+        if flags & KEYFRAME:
+            # Skip the keyframe; the state it holds is the one just reached
+            self.skip_keyframe()
+        return events
+
+    def skip_keyframe(self):
+        data, pos = self.data, self.pos
+        tick, pos = read_varint(data, pos)
+        if tick != self.tick:
+            raise ValueError(f"Keyframe for tick {tick} follows tick {self.tick}")
+        keyframe = self.pos
+        for _ in range(5):
+            _, pos = read_varint(data, pos)
+        for _ in range(3):
+            count, pos = read_varint(data, pos)
+            for _ in range(count):
+                _, pos = read_varint(data, pos)
+        if not self.index or self.index[-1][0] < tick:
+            self.index.append((tick, keyframe))
+        self.pos = pos
+
+
+def play(path, speed, start, cell_size):
+    # pygame is only loaded to watch, so the encoder stays usable in headless processes
+    import pygame
+    from render import Renderer
+
+    player = ReplayPlayer(path)
+    pygame.init()
+    window = pygame.display.set_mode((player.grid_w * cell_size, player.grid_h * cell_size))
+    renderer = Renderer(window, player.grid_w, player.grid_h, cell_size, player.safe_zones, player.obstacles)
+    clock = pygame.time.Clock()
+    player.seek(start)
+    renderer.draw(player)
+    paused = False
+    owed = 0.0
+    last = time.perf_counter()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    step = player.keyframe_every * (1 if event.key == pygame.K_RIGHT else -1)
+                    player.seek(player.tick + step)
+                    renderer.invalidate()
+                elif event.key == pygame.K_UP:
+                    speed *= 2
+                elif event.key == pygame.K_DOWN:
+                    speed = max(1, speed / 2)
+        now = time.perf_counter()
+        if not paused:
+            owed += (now - last) * speed
+            while owed >= 1 and player.tick < player.last_tick:
+                player.step()
+                owed -= 1
+        last = now
+        pygame.display.set_caption(f"Replay tick {player.tick}/{player.last_tick} "
+                                   f"score {player.score} lives {player.lives} x{speed:g}")
+        renderer.draw(player)
+        clock.tick(60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or play back a recorded game.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    info = sub.add_parser('info', help="print a summary of a replay")
+    info.add_argument('path')
+    show = sub.add_parser('play', help="watch a replay (space pauses, arrows seek and change speed)")
+    show.add_argument('path')
+    show.add_argument('--speed', type=float, default=10.0, help="ticks per second")
+    show.add_argument('--start', type=int, default=0, help="tick to start from")
+    show.add_argument('--cell', type=int, default=20, help="cell size in pixels")
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        player = ReplayPlayer(args.path)
+        player.seek(player.last_tick)
+        size = os.path.getsize(args.path)
+        print(f"{args.path}: {player.grid_w}x{player.grid_h} grid, {len(player.obstacles)} walls, seed {player.seed}, {player.last_tick} ticks, "
+              f"{len(player.index)} keyframes, {size} bytes ({size / max(player.last_tick, 1):.1f} bytes/tick)")
+        print(f"final: score {player.score}, lives {player.lives}, result {player.result}")
+    else:
+        play(args.path, args.speed, args.start, args.cell)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import heapq
+
+# Event kinds, in the order they are handled within one tick
+POWER_SPAWN, TIGER_MOVE, HUMAN_MOVE, POWER_END = range(4)
+
+
+def next_on_cadence(tick, delay, interval):
+    # First tick at least `delay` after `tick` that falls on an agent's beat
+    return tick + -(-max(delay, interval) // interval) * interval
+
+
+class Scheduler:
+    """Min-heap of timed events keyed by (tick, kind, order, insertion order).
+
+    Events due on the same tick come out grouped by kind and, within a
+    kind, by `order` (e.g. an agent's creation order, so agents always act
+    in the same sequence) and then in the order they were scheduled.
+    Events that become irrelevant (a caught human's next move) are not
+    removed; the consumer drops them when they come due.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, tick, kind, item=None, order=0):
+        self.seq += 1
+        heapq.heappush(self.heap, (tick, kind, order, self.seq, item))
+
+    def next_tick(self):
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, tick):
+        # Every event due at or before tick as (kind, item), in handling order
+        heap = self.heap
+        due = []
+        while heap and heap[0][0] <= tick:
+            _, kind, _, _, item = heapq.heappop(heap)
+            due.append((kind, item))
+        return due
@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import os
+import socket
+import time
+from collections import deque
+
+from qtable import ArrayQTable, load_tables
+from replay import KEYFRAME_EVERY, TickEncoder, read_varint, write_varint
+from simulation import Simulation
+
+# Stream layout: every message is a varint length, a kind byte and a payload.
+# HELLO describes the game (version, game ID, grid size, keyframe interval,
+# wall cells); KEYFRAME and TICK payloads are replay keyframes and tick
+# records, so a viewer decodes them exactly like a replay file.
+STREAM_VERSION = 1
+HELLO, KEYFRAME, TICK = range(3)
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+MAX_QUEUED = 64      # messages a viewer may fall behind before it is skipped to a keyframe
+SEND_BUFFER = 4 << 10  # socket buffer per viewer; kept small so a slow viewer backs up into its queue
+UNPACED_SLICE = 0.005  # seconds an unpaced game runs before letting viewers write
+
+
+def message(kind, payload=b''):
+    out = bytearray()
+    write_varint(out, len(payload) + 1)
+    out.append(kind)
+    out += payload
+    return bytes(out)
+
+
+def read_message(read):
+    # (kind, payload) using read(n), which returns exactly n bytes or raises EOFError
+    length = shift = 0
+    while True:
+        b = read(1)[0]
+        length |= (b & 0x7f) << shift
+        if b < 0x80:
+            break
+        shift += 7
+    data = read(length)
+    return data[0], data[1:]
+
+
+def hello(game_id, sim, keyframe_every):
+    out = bytearray()
+    for n in (STREAM_VERSION, game_id, sim.grid_w, sim.grid_h, keyframe_every, len(sim.obstacles)):
+        write_varint(out, n)
+    for x, y in sorted(sim.obstacles):
+        write_varint(out, x * sim.grid_w + y)
+    return message(HELLO, out)
+
+
+def read_hello(payload):
+    values, pos = [], 0
+    for _ in range(6):
+        n, pos = read_varint(payload, pos)
+        values.append(n)
+    version, game_id, grid_w, grid_h, keyframe_every, walls = values
+    if version != STREAM_VERSION:
+        raise ValueError(f"Server speaks stream v{version}, expected v{STREAM_VERSION}")
+    obstacles = []
+    for _ in range(walls):
+        cell, pos = read_varint(payload, pos)
+        obstacles.append(divmod(cell, grid_w))
+    return {'game_id': game_id, 'grid_w': grid_w, 'grid_h': grid_h, 'keyframe_every': keyframe_every,
+            'obstacles': obstacles}
+
+
+class Viewer:
+    """One connected client's outbox.
+
+    The game hands it messages with send(), which never waits; a separate
+    pump() task writes them out as fast as the socket drains. When a slow
+    client lets MAX_QUEUED messages pile up, they are thrown away and the
+    viewer is flagged for resync, so the game sends it a keyframe in place
+    of its next tick record and the deltas pick up from there.
+    """
+
+    def __init__(self, writer, limit=MAX_QUEUED):
+        self.writer = writer
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        writer.transport.set_write_buffer_limits(SEND_BUFFER)
+        self.limit = limit
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.resync = False
+        self.dropped = 0
+
+    def send(self, data):
+        if len(self.queue) >= self.limit:
+            self.dropped += len(self.queue)
+            self.queue.clear()
+            self.resync = True
+            return
+        self.queue.append(data)
+        self.ready.set()
+
+    async def pump(self):
+        queue = self.queue
+        while True:
+            if not queue:
+                self.ready.clear()
+                await self.ready.wait()
+            data = b''.join(queue)
+            queue.clear()
+            self.writer.write(data)
+            await self.writer.drain()
+
+
+class GameHost:
+    """Runs one headless Simulation forever and streams it to its viewers.
+
+    Each tick is encoded once and the same bytes go to every viewer. Full
+    keyframes go out every keyframe_every ticks, to viewers that join or
+    fall behind, and to everyone when a finished game resets. The game
+    plays tps ticks per second, or as fast as it can with tps=0, yielding
+    to the viewers' writers between slices either way.
+    """
+
+    def __init__(self, game_id, sim, tps=0, keyframe_every=KEYFRAME_EVERY):
+        self.game_id = game_id
+        self.sim = sim
+        self.tps = tps
+        self.keyframe_every = keyframe_every
+        self.encoder = TickEncoder(sim)
+        self.viewers = set()
+        self.episodes = 0
+
+    def keyframe(self):
+        out = bytearray()
+        self.encoder.write_keyframe(out)
+        return message(KEYFRAME, out)
+
+    def publish(self, data):
+        # data is this tick's message; viewers that need a keyframe get one instead
+        keyframe = None
+        for viewer in self.viewers:
+            if viewer.resync:
+                if keyframe is None:
+                    keyframe = self.keyframe()
+                viewer.resync = False
+                viewer.send(keyframe)
+            else:
+                viewer.send(data)
+
+    def advance(self):
+        sim = self.sim
+        events = sim.step()
+        periodic = sim.tick % self.keyframe_every == 0 or sim.done
+        record = self.encoder.encode(events, periodic)
+        if self.viewers:
+            self.publish(message(TICK, record))
+        if sim.done:
+            self.episodes += 1
+            sim.reset()
+            self.encoder.resync()
+            for viewer in self.viewers:
+                viewer.resync = True
+            if self.viewers:
+                self.publish(None)
+
+    async def run(self):
+        next_tick = time.perf_counter()
+        while True:
+            if self.tps:
+                self.advance()
+                next_tick += 1 / self.tps
+                await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+            else:
+                end = time.perf_counter() + UNPACED_SLICE
+                while time.perf_counter() < end:
+                    self.advance()
+                await asyncio.sleep(0)
+
+    async def serve(self, reader, writer):
+        # Stream to one viewer until it disconnects
+        viewer = Viewer(writer)
+        writer.write(hello(self.game_id, self.sim, self.keyframe_every))
+        # The encoder is between ticks here, so the state it would delta from is the current one
+        viewer.resync = False
+        viewer.send(self.keyframe())
+        self.viewers.add(viewer)
+        try:
+            await viewer.pump()
+        except ConnectionError:
+            pass
+        finally:
+            self.viewers.discard(viewer)
+            writer.close()
+
+
+class Server:
+    """Hosts games and hands each connection to the game it asks for.
+
+    A client sends one line, "watch <game ID>\\n", then only reads.
+    """
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+
+    async def handle(self, reader, writer):
+        try:
+            line = await asyncio.wait_for(reader.readline(), 10)
+            words = line.decode('ascii', 'replace').split()
+            game_id = int(words[1]) if len(words) == 2 and words[0] == 'watch' and words[1].isdigit() else -1
+        except (asyncio.TimeoutError, ConnectionError):
+            game_id = -1
+        if not 0 <= game_id < len(self.hosts):
+            writer.close()
+            return
+        await self.hosts[game_id].serve(reader, writer)
+
+    async def run(self, tcp=None, unix=None):
+        servers = []
+        if tcp:
+            host, _, port = tcp.rpartition(':')
+            servers.append(await asyncio.start_server(self.handle, host or None, int(port)))
+        if unix:
+            if os.path.exists(unix):
+                os.unlink(unix)
+            servers.append(await asyncio.start_unix_server(self.handle, unix))
+        games = [asyncio.ensure_future(host.run()) for host in self.hosts]
+        try:
+            await asyncio.gather(*games, *(s.serve_forever() for s in servers))
+        finally:
+            for task in games:
+                task.cancel()
+            for s in servers:
+                s.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless games and stream them to viewers (see viewer.py).")
+    parser.add_argument('--games', type=int, default=1, help="games to host; viewers pick one by ID")
+    parser.add_argument('--grid', default='20x20', help="grid size as WxH")
+    parser.add_argument('--humans', type=int, default=5)
+    parser.add_argument('--tigers', type=int, default=5)
+    parser.add_argument('--food', type=int, default=20)
+    parser.add_argument('--lives', type=int, default=3)
+    parser.add_argument('--max-ticks', type=int, default=3000)
+    parser.add_argument('--seed', type=int, default=None, help="game i plays seed + i")
+    parser.add_argument('--tps', type=float, default=0, help="ticks per second per game (0: as fast as possible)")
+    parser.add_argument('--keyframe-every', type=int, default=KEYFRAME_EVERY)
+    parser.add_argument('--tcp', default=DEFAULT_ADDRESS, help="HOST:PORT to listen on ('' to disable)")
+    parser.add_argument('--unix', default=None, help="also listen on this Unix socket path")
+    parser.add_argument('--checkpoint', default=None, help="Q-tables to start from (default: fresh)")
+    args = parser.parse_args(argv)
+
+    grid_w, grid_h = (int(v) for v in args.grid.lower().split('x'))
+    if args.checkpoint:
+        q_humans, q_tigers, _ = load_tables(args.checkpoint, mmap=False)
+    else:
+        q_humans, q_tigers = ArrayQTable(), ArrayQTable()
+    # Every game learns into the same tables
+    hosts = []
+    for i in range(args.games):
+        sim = Simulation(grid_w, grid_h, q_humans, q_tigers, lives=args.lives, max_ticks=args.max_ticks,
+                         humans=args.humans, tigers=args.tigers, food=args.food,
+                         seed=None if args.seed is None else args.seed + i)
+        hosts.append(GameHost(i, sim, args.tps, args.keyframe_every))
+    where = ' and '.join(filter(None, [args.tcp, args.unix]))
+    print(f"serving {args.games} game(s) on {where}")
+    try:
+        asyncio.run(Server(hosts).run(args.tcp, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+import random
+
+from agents import AgentStore
+from constants import (ALL_ACTIONS, ALPHA, EDGE_ACTIONS, COLORS, EAT_PAUSE, EPSILON, FOOD_SCORE, GAMMA, HUMAN_INTERVAL,
+                       POWER_DURATION, POWER_SPAWN_DELAY, RETREAT_WAIT, REWARDS, TIGER_INTERVAL)
+from encoders import OffsetEncoder
+from qtable import ArrayQTable, make_q_table
+from scheduler import HUMAN_MOVE, POWER_END, POWER_SPAWN, TIGER_MOVE, Scheduler, next_on_cadence
+from spatial import BucketGrid, DistanceField, FlowField, FreeCells, OccupancyGrid, ThreatMap, neighbor_table
+
+
+# How agents outside a retreat choose their moves: 'steer' follows the
+# flow fields (the Q-tables learn alongside without steering), 'q' takes
+# each agent's epsilon-greedy Q action, so the tables drive the game
+POLICIES = ('steer', 'q')
+
+
+def count_range(n):
+    return (n, n) if isinstance(n, int) else tuple(n)
+
+
+def make_rewards(overrides=None):
+    # REWARDS with the given entries replaced
+    rewards = dict(REWARDS)
+    for name, value in (overrides or {}).items():
+        if name not in rewards:
+            raise ValueError(f"Unknown reward {name!r}; expected one of {', '.join(REWARDS)}")
+        rewards[name] = value
+    return rewards
+
+
+def corner_cells(grid_w, grid_h):
+    # The four safe zones
+    return [(0, 0), (0, grid_w - 1), (grid_h - 1, 0), (grid_h - 1, grid_w - 1)]
+
+
+class Simulation:
+    """Headless Tiger/Human/Food game advanced one logical tick per step()."""
+
+    def __init__(self, grid_w=20, grid_h=20, q_table_humans=None, q_table_tigers=None,
+                 alpha=ALPHA, gamma=GAMMA, epsilon=EPSILON, lives=3, max_ticks=None, q_backend='array',
+                 danger_radius=1, penalty_radius=2, humans=(2, 5), tigers=(2, 5), food=(5, 20), seed=None,
+                 rewards=None, food_score=FOOD_SCORE, obstacles=(), encoder=None, policy='steer'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}; expected one of {', '.join(POLICIES)}")
+        self.policy = policy
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.safe_zones = corner_cells(grid_w, grid_h)
+
+        # Walls nothing can enter or spawn on. Tigers walk edge-only and
+        # humans in 8 directions, so each gets its own neighbour table.
+        self.obstacles = frozenset(obstacles)
+        if self.obstacles & set(self.safe_zones):
+            raise ValueError("Obstacles cannot cover a safe zone")
+        self.tiger_moves = neighbor_table(grid_w, grid_h, EDGE_ACTIONS, self.obstacles)
+        self.human_moves = neighbor_table(grid_w, grid_h, ALL_ACTIONS, self.obstacles)
+
+        # Q-tables are passed in so learning survives across episodes
+        self.q_table_humans = q_table_humans if q_table_humans is not None else make_q_table(q_backend)
+        self.q_table_tigers = q_table_tigers if q_table_tigers is not None else make_q_table(q_backend)
+        # Turns an agent's surroundings into a Q-table state (see encoders.py)
+        self.encoder = encoder if encoder is not None else OffsetEncoder()
+        if not self.encoder.compact and any(isinstance(t, ArrayQTable)
+                                            for t in (self.q_table_humans, self.q_table_tigers)):
+            raise ValueError("This state encoder needs a hashed Q-table, e.g. q_backend='bounded'")
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.rewards = make_rewards(rewards)
+        self.food_score = food_score
+
+        self.start_lives = lives
+        self.max_ticks = max_ticks
+
+        # Population sizes: a fixed count or an inclusive (min, max) range
+        self.human_range = count_range(humans)
+        self.tiger_range = count_range(tigers)
+        self.food_range = count_range(food)
+        if self.human_range[1] + self.tiger_range[1] > grid_w * grid_h - len(self.obstacles):
+            raise ValueError("Grid too small for the requested number of agents")
+
+        self.tiger_interval = TIGER_INTERVAL
+        self.human_interval = HUMAN_INTERVAL
+        self.eat_pause = EAT_PAUSE
+        self.retreat_wait = RETREAT_WAIT
+        self.power_duration = POWER_DURATION
+
+        # Humans refuse to step within danger_radius of a tiger and are
+        # penalised for ending a move within penalty_radius of one
+        self.danger_radius = danger_radius
+        self.penalty_radius = penalty_radius
+        self.threat_map = ThreatMap(grid_w, grid_h, max(danger_radius, penalty_radius))
+
+        # The first episode plays `seed`; later resets draw their seed from this
+        # stream. Without a seed one is taken from the global random module.
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.seeder = random.Random(seed)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        # Independent streams per concern, so e.g. a change in exploration
+        # never shifts where food spawns in a game played from the same seed
+        self.seed = seed if seed is not None else self.seeder.getrandbits(63)
+        self.spawn_rng = random.Random(f"{self.seed}:spawn")
+        self.explore_rng = random.Random(f"{self.seed}:explore")
+        self.tie_rng = random.Random(f"{self.seed}:tie")
+        rng = self.spawn_rng
+
+        self.tick = 0
+        self.score = 0
+        self.lives = self.start_lives
+        self.power_active = False
+        self.power_end_time = 0
+        self.power_up = None
+        self.done = False
+
+        # Everything time-based runs off one event queue: each agent's next
+        # move, and the power-up's spawn and expiry. Ticks with nothing due
+        # cost nothing, and paused or waiting agents are not looked at
+        # until they wake up.
+        self.scheduler = Scheduler()
+        self.scheduler.push(rng.randint(*POWER_SPAWN_DELAY), POWER_SPAWN)
+        self.result = None
+
+        # Per-cell agent counts for O(1) collision and catch checks, and the
+        # empty cells that everything spawns into
+        self.human_cells = OccupancyGrid(self.grid_w, self.grid_h)
+        self.tiger_cells = OccupancyGrid(self.grid_w, self.grid_h)
+        self.free = FreeCells(self.grid_w, self.grid_h)
+        for pos in self.obstacles:
+            self.free.add(pos)
+
+        # Create humans
+        num_humans = rng.randint(*self.human_range)
+        self.humans = AgentStore('human', COLORS['human'])
+        for pos in self.free.sample(rng, num_humans):
+            self.humans.add(pos[0], pos[1], self.human_interval)
+            self.human_cells.add(pos)
+            self.free.add(pos)
+
+        # Create tigers
+        num_tigers = rng.randint(*self.tiger_range)
+        self.tigers = AgentStore('tiger', COLORS['tiger'])
+        for pos in self.free.sample(rng, num_tigers):
+            self.tigers.add(pos[0], pos[1], self.tiger_interval)
+            self.tiger_cells.add(pos)
+            self.free.add(pos)
+
+        # Spawn food
+        self.food_list = self.spawn_food(rng.randint(*self.food_range))
+        for pos in self.food_list:
+            self.free.add(pos)
+
+        # Nearest-target indexes, kept in sync as agents move and food is eaten
+        self.human_index = BucketGrid(self.grid_w, self.grid_h, self.humans.positions())
+        self.tiger_index = BucketGrid(self.grid_w, self.grid_h, self.tigers.positions())
+        self.food_index = DistanceField(self.grid_w, self.grid_h, self.food_list)
+        self.threat_stale = True
+
+        # Shared BFS flow fields the agents steer by: one per target set and
+        # way of moving, synced at the start of each phase that reads them
+        self.food_flow = FlowField(self.grid_w, ALL_ACTIONS, self.human_moves, self.food_list)
+        self.safe_flow = FlowField(self.grid_w, ALL_ACTIONS, self.human_moves, self.safe_zones)
+        self.guard_flow = FlowField(self.grid_w, EDGE_ACTIONS, self.tiger_moves, self.food_list)
+        self.prey_flow = FlowField(self.grid_w, EDGE_ACTIONS, self.tiger_moves, self.humans.positions())
+
+        # Initialize states and actions for humans and tigers
+        for h in self.humans:
+            nearest_food = self.food_index.nearest(h.pos())
+            nearest_tiger = self.tiger_index.nearest(h.pos())
+            h.state = self.make_human_state(h.pos(), nearest_food, nearest_tiger, h)
+            h.action = self.choose_action(self.q_table_humans, h.state)
+
+        for t in self.tigers:
+            nearest_human = self.human_index.nearest(t.pos())
+            nearest_food = self.food_index.nearest(t.pos())
+            t.state = self.make_tiger_state(t.pos(), nearest_human, nearest_food, t)
+            t.action = self.choose_action(self.q_table_tigers, t.state)
+
+        # Agents due on the same tick act in ID (creation) order
+        for kind, agents in ((TIGER_MOVE, self.tigers), (HUMAN_MOVE, self.humans)):
+            for agent in agents:
+                self.scheduler.push(agent.interval, kind, agent, agent.id)
+
+    def step(self):
+        # Advance the world by one tick and return the events that happened in it
+        if self.done:
+            return []
+        self.tick += 1
+        events = []
+        tigers, humans = [], []
+        for kind, item in self.scheduler.pop_due(self.tick):
+            if kind == TIGER_MOVE:
+                tigers.append(item)
+            elif kind == HUMAN_MOVE:
+                humans.append(item)
+            elif kind == POWER_SPAWN:
+                self.power_up = self.spawn_power()
+                if self.power_up is not None:
+                    self.free.add(self.power_up)
+                    events.append(('power_spawn', self.power_up))
+                else:
+                    self.scheduler.push(self.tick + 1, POWER_SPAWN)
+            elif kind == POWER_END:
+                self.power_active = False
+                self.scheduler.push(self.tick + self.spawn_rng.randint(*POWER_SPAWN_DELAY), POWER_SPAWN)
+                events.append(('power_end', None))
+
+        if tigers:
+            self.move_tigers(events, tigers)
+            for tiger in tigers:
+                self.scheduler.push(next_on_cadence(self.tick, tiger.paused_until - self.tick, tiger.interval),
+                                    TIGER_MOVE, tiger, tiger.id)
+            if self.done:
+                return events
+
+            # Check if power-up collected
+            if self.power_up is not None and self.power_up in self.tiger_cells:
+                self.power_active = True
+                self.power_end_time = self.tick + self.power_duration
+                self.scheduler.push(self.power_end_time + 1, POWER_END)
+                events.append(('power_pickup', self.power_up))
+                self.free.remove(self.power_up)
+                self.power_up = None
+
+        # Caught humans still have a move queued; it is dropped here
+        humans = [h for h in humans if h.alive]
+        if humans:
+            self.move_humans(events, humans)
+            for human in humans:
+                # A human waiting in a safe zone sleeps until the wait is over
+                delay = 0
+                if human.retreating and self.in_safe_zone(human.pos()):
+                    delay = human.retreat_start_time + self.retreat_wait - self.tick
+                self.scheduler.push(next_on_cadence(self.tick, delay, human.interval), HUMAN_MOVE, human, human.id)
+
+        # Win condition: all food eaten
+        if not self.food_list:
+            self.finish('win', events)
+        elif not self.humans:
+            self.finish('lose', events)
+        elif self.max_ticks is not None and self.tick >= self.max_ticks:
+            self.finish('timeout', events)
+        return events
+
+    def finish(self, result, events):
+        self.done = True
+        self.result = result
+        events.append(('done', result))
+
+    def run_episode(self):
+        while not self.done:
+            self.step()
+        return self.result
+
+    def move_tigers(self, events, tigers=None):
+        # Move the tigers that are due (default: every tiger not busy eating)
+        if tigers is None:
+            tigers = [t for t in self.tigers if self.tick >= t.paused_until]
+        self.guard_flow.sync()
+        for tiger in tigers:
+            state = tiger.state
+            action = tiger.action
+            old_pos = tiger.pos()
+
+            # Determine mode: attack or guard food
+            nearest_human = self.human_index.nearest(old_pos)
+            dist_human = self.manhattan(old_pos, nearest_human)
+            nearest_food = self.food_index.nearest(old_pos)
+
+            if self.policy == 'q':
+                move = self.policy_step(tiger, self.tiger_moves, EDGE_ACTIONS)
+            elif dist_human <= 3:
+                # Attack mode: move towards the nearest human (humans hold still
+                # in this phase, so syncing here only skips it when nobody attacks)
+                self.prey_flow.sync()
+                move = self.prey_flow.step(old_pos)
+            else:
+                # Guard mode: move towards the nearest food
+                move = self.guard_flow.step(old_pos)
+
+            pos = self.move_agent(tiger, move, self.tiger_index, self.tiger_cells)
+            self.threat_stale = True
+
+            # Check if caught a human (the first created, if several share the cell)
+            caught = self.humans.first_at(pos) if pos in self.human_cells else None
+
+            reward = self.tiger_reward(tiger, old_pos)
+
+            next_state = self.make_tiger_state(pos, nearest_human, nearest_food, tiger)
+            next_action = self.choose_action(self.q_table_tigers, next_state)
+            self.update_q(self.q_table_tigers, state, action, reward, next_state, next_action)
+            tiger.state = next_state
+            tiger.action = next_action
+
+            if caught is not None:
+                # Human caught: tiger pauses to eat
+                tiger.paused_until = self.tick + self.eat_pause
+                # Remove human and decrease lives
+                self.humans.remove(caught)
+                self.prey_flow.remove(pos)
+                self.human_index.remove(pos)
+                self.human_cells.remove(pos)
+                self.free.remove(pos)
+                self.lives -= 1
+                events.append(('catch', pos))
+                if self.lives <= 0:
+                    self.finish('lose', events)
+                return
+
+    def move_humans(self, events, humans=None):
+        # Tigers hold still during the human phase, so one threat map serves it all
+        if self.threat_stale:
+            self.threat_map.build(*self.tigers.xy())
+            self.threat_stale = False
+        # Food eaten during this phase shows up in the field next tick
+        self.food_flow.sync()
+
+        for human in humans if humans is not None else self.humans:
+            if human.retreating:
+                # Check if reached safe cell
+                if self.in_safe_zone(human.pos()):
+                    # Wait in the safe zone before going back out
+                    if self.tick - human.retreat_start_time >= self.retreat_wait:
+                        human.retreating = False
+                    else:
+                        continue
+                else:
+                    # Move step-by-step toward the nearest safe zone while avoiding tigers
+                    move = self.safe_step(human, self.safe_flow)
+                    self.move_agent(human, move, self.human_index, self.human_cells, self.prey_flow)
+                    continue  # skip Q-learning and food logic
+
+            # Normal behavior (not retreating)
+            state = human.state
+            action = human.action
+            old_pos = human.pos()
+
+            nearest_food = self.food_index.nearest(human.pos())
+            nearest_tiger = self.tiger_index.nearest(human.pos())
+
+            if self.policy == 'q':
+                move = self.policy_step(human, self.human_moves, ALL_ACTIONS)
+            else:
+                move = self.safe_step(human, self.food_flow)
+            self.move_agent(human, move, self.human_index, self.human_cells, self.prey_flow)
+
+            # If food collected
+            if human.pos() in self.food_index:
+                self.food_list.remove(human.pos())
+                self.food_index.remove(human.pos())
+                self.food_flow.remove(human.pos())
+                self.guard_flow.remove(human.pos())
+                self.free.remove(human.pos())
+                self.score += self.food_score
+                events.append(('food', human.pos()))
+
+                # Set up retreat
+                human.retreating = True
+                human.retreat_start_time = self.tick
+                continue  # skip Q-learning during retreat
+
+            # Q-learning update
+            reward = self.human_reward(human, old_pos)
+            next_state = self.make_human_state(human.pos(), nearest_food, nearest_tiger, human)
+            next_action = self.choose_action(self.q_table_humans, next_state)
+            self.update_q(self.q_table_humans, state, action, reward, next_state, next_action)
+            human.state = next_state
+            human.action = next_action
+
+    def move_agent(self, agent, move, index, cells, flow=None):
+        # Returns the agent's new position
+        old_pos = agent.pos()
+        agent.move(*move, self.grid_w, self.grid_h)
+        pos = agent.pos()
+        if pos != old_pos:
+            index.move(old_pos, pos)
+            cells.move(old_pos, pos)
+            self.free.move(old_pos, pos)
+            if flow is not None:
+                flow.move(old_pos, pos)
+        return pos
+
+    def safe_step(self, human, flow):
+        # Step down the flow field using only moves that keep clear of every
+        # tiger; with no such move, take the field's own step regardless
+        threat = self.threat_map
+        hx, hy = human.pos()
+        c = hx * self.grid_w + hy
+        best, best_move = None, None
+        for move, nb in zip(ALL_ACTIONS, self.human_moves[c].tolist()):
+            if nb == len(self.human_moves) - 1:
+                continue  # off the grid or into a wall
+            nx, ny = hx + move[0], hy + move[1]
+            if threat.distance(nx, ny) > self.danger_radius:
+                d = flow.distance((nx, ny))
+                if best is None or d < best:
+                    best, best_move = d, move
+        return best_move if best_move is not None else flow.step((hx, hy))
+
+    def policy_step(self, agent, moves, actions):
+        # The agent's Q action if `actions` allows it and it leads onto the grid
+        # and off the walls; otherwise the agent stands still
+        if agent.action not in actions:
+            return (0, 0)
+        x, y = agent.pos()
+        if moves[x * self.grid_w + y, actions.index(agent.action)] == len(moves) - 1:
+            return (0, 0)
+        return agent.action
+
+    def in_safe_zone(self, pos):
+        return self.safe_flow.distance(pos) == 0
+
+    def human_reward(self, h, old_pos):
+        r = self.rewards
+        reward = r['human_step']  # step penalty to encourage fast food collection
+        if h.pos() in self.food_index:
+            reward += r['human_food']
+        dist_to_food_before = self.food_index.distance(old_pos)
+        dist_to_food_after = self.food_index.distance(h.pos())
+        if dist_to_food_after < dist_to_food_before:
+            reward += r['human_closer']  # reward for moving closer to food
+
+        # penalty if near tiger
+        if self.threat_map.distance(*h.pos()) <= self.penalty_radius:
+            reward += r['human_near_tiger']
+
+        return reward
+
+    def tiger_reward(self, t, old_pos):
+        r = self.rewards
+        reward = r['tiger_step']  # step penalty
+
+        # Reward for being near food (guarding)
+        dist_to_food = self.food_index.distance(t.pos())
+        if dist_to_food <= 2:
+            reward += r['tiger_guard']
+
+        # Reward for moving closer to human (attack)
+        nearest_human_pos = self.human_index.nearest(t.pos())
+        dist_to_human_before = self.manhattan(old_pos, nearest_human_pos)
+        dist_to_human_after = self.manhattan(t.pos(), nearest_human_pos)
+        if dist_to_human_after < dist_to_human_before:
+            reward += r['tiger_closer']
+
+        # Extra reward if tiger is powered (power active)
+        if self.power_active:
+            reward += r['tiger_powered']
+
+        return reward
+
+    def get_q(self, q_table, state, action):
+        return q_table.get(state, action)
+
+    def choose_action(self, q_table, state):
+        return q_table.choose(state, self.epsilon, self.explore_rng, self.tie_rng)
+
+    def update_q(self, q_table, state, action, reward, next_state, next_action):
+        q_table.update(state, action, reward, next_state, next_action, self.alpha, self.gamma)
+
+    def spawn_food(self, count):
+        # Up to count distinct empty cells; fewer only if the board fills up
+        return self.free.sample(self.spawn_rng, count)
+
+    def spawn_power(self):
+        # Returns None on a full board; the spawn is retried next tick
+        return self.free.pick(self.spawn_rng)
+
+    def closest(self, pos, positions):
+        if not positions:
+            return pos
+        return min(positions, key=lambda p: abs(p[0] - pos[0]) + abs(p[1] - pos[1]))
+
+    def manhattan(self, p1, p2):
+        return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
+
+    def make_human_state(self, human_pos, food_pos, tiger_pos, human=None):
+        return self.encoder.human_state(self, human_pos, food_pos, tiger_pos, human)
+
+    def make_tiger_state(self, tiger_pos, human_pos, food_pos, tiger=None):
+        return self.encoder.tiger_state(self, tiger_pos, human_pos, food_pos, tiger)
+
+    def optimal_move(self, dx, dy):
+        # Move 1 step toward dx, dy (Manhattan)
+        if dx > 0:
+            return (1, 0)
+        elif dx < 0:
+            return (-1, 0)
+        elif dy > 0:
+            return (0, 1)
+        elif dy < 0:
+            return (0, -1)
+        else:
+            return (0, 0)
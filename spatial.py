@@ -0,0 +1,540 @@
+from array import array
+
+import numpy as np
+
+
+def min_plus(d0, axis):
+    # out[k] = min over k' of d0[k'] + |k - k'| along one axis, plus the k' that
+    # achieves it. Computed as two running minimums with k' packed into the
+    # low bits of each key, so the winning index rides along with the value.
+    n = d0.shape[axis]
+    shift = 1 << n.bit_length()
+    idx = np.arange(n).reshape([-1 if a == axis else 1 for a in range(d0.ndim)])
+    fwd = np.minimum.accumulate((d0 - idx) * shift + idx, axis=axis)
+    back = np.flip(np.minimum.accumulate(np.flip((d0 + idx) * shift + idx, axis=axis), axis=axis), axis=axis)
+    fwd_d = fwd // shift + idx
+    back_d = back // shift - idx
+    use_fwd = fwd_d <= back_d
+    return np.where(use_fwd, fwd_d, back_d), np.where(use_fwd, fwd % shift, back % shift)
+
+
+def l1_transform(d0, near_x, near_y):
+    # Exact Manhattan transform seeded with per-cell starting distances d0:
+    # a min-plus pass along rows, then one down the columns
+    row_d, best_col = min_plus(d0.astype(np.int64), axis=1)
+    dist, best_row = min_plus(row_d, axis=0)
+    best_col = np.take_along_axis(best_col, best_row, axis=0)
+    return dist.astype(np.int32), near_x[best_row, best_col], near_y[best_row, best_col]
+
+
+class DistanceField:
+    """Manhattan distance transform to a set of target cells.
+
+    Every cell stores the distance to, and position of, its nearest target,
+    so nearest()/distance() are O(1). Suited to targets that change rarely
+    (food, safe zones). Adding a target relaxes the field in one vectorized
+    pass. Removing one re-solves only the cells it was nearest to, inside
+    the bounding box of that region.
+    """
+
+    def __init__(self, grid_w, grid_h, positions=()):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.far = grid_w + grid_h + 1
+        self.counts = np.zeros((grid_h, grid_w), dtype=np.int32)
+        self.size = 0
+        for pos in positions:
+            self.counts[pos] += 1
+            self.size += 1
+        self.stale = True
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, pos):
+        return self.counts.item(pos) > 0
+
+    def add(self, pos):
+        self.counts[pos] += 1
+        self.size += 1
+        if self.stale or self.counts.item(pos) > 1:
+            return
+        rows, cols = np.ogrid[:self.grid_h, :self.grid_w]
+        d = np.abs(rows - pos[0]) + np.abs(cols - pos[1])
+        closer = d < self.dist
+        self.dist[closer] = d[closer]
+        self.near_x[closer] = pos[0]
+        self.near_y[closer] = pos[1]
+
+    def remove(self, pos):
+        self.counts[pos] -= 1
+        self.size -= 1
+        if self.counts.item(pos) == 0 and not self.stale:
+            self.repair(pos)
+
+    def move(self, old, new):
+        if old != new:
+            self.remove(old)
+            self.add(new)
+
+    def nearest(self, pos):
+        # Like Game.closest: with no targets the query position is returned
+        if self.stale:
+            self.rebuild()
+        if not self.size:
+            return pos
+        return (self.near_x.item(pos), self.near_y.item(pos))
+
+    def distance(self, pos):
+        if self.stale:
+            self.rebuild()
+        return self.dist.item(pos) if self.size else 0
+
+    def rebuild(self):
+        src = self.counts > 0
+        rows, cols = np.indices((self.grid_h, self.grid_w), dtype=np.int32)
+        self.dist, self.near_x, self.near_y = l1_transform(np.where(src, 0, self.far), rows, cols)
+        self.stale = False
+
+    def repair(self, pos):
+        # Cells that pointed at pos get their distance from the cells around
+        # their region, which still point at surviving targets
+        if not self.size:
+            self.stale = True
+            return
+        region = (self.near_x == pos[0]) & (self.near_y == pos[1])
+        rows = np.flatnonzero(region.any(axis=1))
+        cols = np.flatnonzero(region.any(axis=0))
+        if not len(rows):
+            return
+        window = (slice(max(rows[0] - 1, 0), rows[-1] + 2), slice(max(cols[0] - 1, 0), cols[-1] + 2))
+        d0 = np.where(region[window], self.far, self.dist[window])
+        dist, near_x, near_y = l1_transform(d0, self.near_x[window], self.near_y[window])
+        self.dist[window], self.near_x[window], self.near_y[window] = dist, near_x, near_y
+
+
+class BucketGrid:
+    """Nearest-neighbour index for moving agents.
+
+    Positions are hashed into square buckets; moves and removals touch one
+    or two buckets. A query scans rings of buckets outward from the query
+    and stops once no closer bucket can exist, which is O(1) for a roughly
+    uniform population.
+    """
+
+    def __init__(self, grid_w, grid_h, positions=(), bucket_size=None):
+        positions = list(positions)
+        if bucket_size is None:
+            # Aim for about one agent per bucket so rings stay short
+            bucket_size = max(2, int((grid_w * grid_h / max(len(positions), 1)) ** 0.5))
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.bucket_size = bucket_size
+        self.rows = -(-grid_h // bucket_size)
+        self.cols = -(-grid_w // bucket_size)
+        self.buckets = [[] for _ in range(self.rows * self.cols)]
+        self.size = 0
+        for pos in positions:
+            self.add(pos)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, pos):
+        return pos in self.buckets[self.bucket_of(pos)]
+
+    def bucket_of(self, pos):
+        return (pos[0] // self.bucket_size) * self.cols + pos[1] // self.bucket_size
+
+    def add(self, pos):
+        self.buckets[self.bucket_of(pos)].append(pos)
+        self.size += 1
+
+    def remove(self, pos):
+        self.buckets[self.bucket_of(pos)].remove(pos)
+        self.size -= 1
+
+    def move(self, old, new):
+        bucket = self.buckets[self.bucket_of(old)]
+        if self.bucket_of(old) == self.bucket_of(new):
+            bucket[bucket.index(old)] = new
+        else:
+            bucket.remove(old)
+            self.buckets[self.bucket_of(new)].append(new)
+
+    def nearest(self, pos):
+        if not self.size:
+            return pos
+        x, y = pos
+        bx, by = x // self.bucket_size, y // self.bucket_size
+        best, best_d = pos, None
+        for ring in range(max(self.rows, self.cols)):
+            # Anything in this ring is at least (ring - 1) * size + 1 cells away
+            if best_d is not None and (ring - 1) * self.bucket_size + 1 > best_d:
+                break
+            for rx in range(max(bx - ring, 0), min(bx + ring, self.rows - 1) + 1):
+                on_edge = rx == bx - ring or rx == bx + ring
+                step = 1 if on_edge else 2 * ring
+                for ry in range(by - ring, by + ring + 1, step or 1):
+                    if 0 <= ry < self.cols:
+                        for p in self.buckets[rx * self.cols + ry]:
+                            d = abs(p[0] - x) + abs(p[1] - y)
+                            if best_d is None or d < best_d:
+                                best, best_d = p, d
+        return best
+
+    def nearest_k(self, pos, k):
+        # Up to k positions closest to pos, nearest first
+        x, y = pos
+        bx, by = x // self.bucket_size, y // self.bucket_size
+        found = []
+        for ring in range(max(self.rows, self.cols)):
+            if len(found) >= k and (ring - 1) * self.bucket_size + 1 > found[k - 1][0]:
+                break
+            for rx in range(max(bx - ring, 0), min(bx + ring, self.rows - 1) + 1):
+                on_edge = rx == bx - ring or rx == bx + ring
+                step = 1 if on_edge else 2 * ring
+                for ry in range(by - ring, by + ring + 1, step or 1):
+                    if 0 <= ry < self.cols:
+                        for p in self.buckets[rx * self.cols + ry]:
+                            found.append((abs(p[0] - x) + abs(p[1] - y), p))
+            found.sort()
+        return [p for _, p in found[:k]]
+
+    def distance(self, pos):
+        near = self.nearest(pos)
+        return abs(near[0] - pos[0]) + abs(near[1] - pos[1])
+
+
+class ThreatMap:
+    """Distance to the nearest tiger, capped at radius + 1, one byte per cell.
+
+    Built in one vectorized pass by stamping a Manhattan diamond around every
+    tiger, after which "is this cell within r of a tiger" for any r <= radius
+    is a single byte lookup.
+    """
+
+    def __init__(self, grid_w, grid_h, radius):
+        if not 0 <= radius < 255:
+            raise ValueError("Threat radius must be between 0 and 254")
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.radius = radius
+        offsets = [(dx, dy) for dx in range(-radius, radius + 1)
+                   for dy in range(-radius, radius + 1) if abs(dx) + abs(dy) <= radius]
+        self.off_x = np.array([o[0] for o in offsets], dtype=np.int64)
+        self.off_y = np.array([o[1] for o in offsets], dtype=np.int64)
+        self.off_d = np.abs(self.off_x) + np.abs(self.off_y)
+        self.cells = bytes([radius + 1]) * (grid_w * grid_h)
+
+    def build(self, tx, ty):
+        # tx, ty: integer arrays of tiger rows and columns
+        grid = np.full(self.grid_w * self.grid_h, self.radius + 1, dtype=np.uint8)
+        if len(tx):
+            xs = (tx[:, None].astype(np.int64) + self.off_x).ravel()
+            ys = (ty[:, None].astype(np.int64) + self.off_y).ravel()
+            ds = np.broadcast_to(self.off_d, (len(tx), len(self.off_d))).ravel()
+            inside = (xs >= 0) & (xs < self.grid_h) & (ys >= 0) & (ys < self.grid_w)
+            np.minimum.at(grid, xs[inside] * self.grid_w + ys[inside], ds[inside].astype(np.uint8))
+        self.cells = grid.tobytes()
+
+    def distance(self, x, y):
+        return self.cells[x * self.grid_w + y]
+
+
+class OccupancyGrid:
+    """Agent count per cell in a flat int array.
+
+    Membership tests, moves and removals are single index operations, so
+    collision and catch checks cost O(1) per agent. grid() exposes the same
+    memory as a (grid_h, grid_w) NumPy array for bulk work.
+    """
+
+    def __init__(self, grid_w, grid_h, positions=()):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.counts = array('i', bytes(4 * grid_w * grid_h))
+        for pos in positions:
+            self.add(pos)
+
+    def __contains__(self, pos):
+        return self.counts[pos[0] * self.grid_w + pos[1]] > 0
+
+    def count(self, pos):
+        return self.counts[pos[0] * self.grid_w + pos[1]]
+
+    def add(self, pos):
+        self.counts[pos[0] * self.grid_w + pos[1]] += 1
+
+    def remove(self, pos):
+        self.counts[pos[0] * self.grid_w + pos[1]] -= 1
+
+    def move(self, old, new):
+        self.counts[old[0] * self.grid_w + old[1]] -= 1
+        self.counts[new[0] * self.grid_w + new[1]] += 1
+
+    def grid(self):
+        return np.frombuffer(self.counts, dtype=np.int32).reshape(self.grid_h, self.grid_w)
+
+
+class FreeCells:
+    """The empty cells of the grid, kept for O(1) uniform random picks.
+
+    counts holds how many things (agents, food, the power-up) are on each
+    cell. The cells whose count is zero sit unordered in `cells`, and `slot`
+    maps a cell to its index there (-1 while occupied). A cell becoming
+    occupied is swap-removed and one becoming empty is appended, so every
+    update is O(1) and picking is a single random index.
+    """
+
+    def __init__(self, grid_w, grid_h):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        n = grid_w * grid_h
+        self.counts = array('i', bytes(4 * n))
+        self.cells = array('i', range(n))
+        self.slot = array('i', range(n))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, pos):
+        return self.counts[pos[0] * self.grid_w + pos[1]] == 0
+
+    def add(self, pos):
+        # One more thing on pos
+        c = pos[0] * self.grid_w + pos[1]
+        self.counts[c] += 1
+        if self.counts[c] == 1:
+            cells, slot = self.cells, self.slot
+            last = cells.pop()
+            if last != c:
+                cells[slot[c]] = last
+                slot[last] = slot[c]
+            slot[c] = -1
+
+    def remove(self, pos):
+        # One thing fewer on pos
+        c = pos[0] * self.grid_w + pos[1]
+        self.counts[c] -= 1
+        if self.counts[c] == 0:
+            self.slot[c] = len(self.cells)
+            self.cells.append(c)
+
+    def move(self, old, new):
+        self.remove(old)
+        self.add(new)
+
+    def pick(self, rng):
+        # A uniformly random empty cell, or None on a full board
+        if not self.cells:
+            return None
+        return divmod(self.cells[rng.randrange(len(self.cells))], self.grid_w)
+
+    def sample(self, rng, k):
+        # min(k, free) distinct empty cells in O(k): a partial Fisher-Yates
+        # shuffle of the free array. The cells stay free until add()ed.
+        cells, slot = self.cells, self.slot
+        n = len(cells)
+        out = []
+        for j in range(min(k, n)):
+            i = rng.randrange(j, n)
+            a, b = cells[i], cells[j]
+            cells[i], cells[j] = b, a
+            slot[a], slot[b] = j, i
+            out.append(divmod(a, self.grid_w))
+        return out
+
+
+def distinct(a):
+    # Sorted unique values; cheaper than np.unique for the small arrays of a BFS level
+    a = np.sort(a)
+    keep = np.empty(len(a), dtype=bool)
+    keep[:1] = True
+    np.not_equal(a[1:], a[:-1], out=keep[1:])
+    return a[keep]
+
+
+def neighbor_table(grid_w, grid_h, moves, blocked=()):
+    # (cells + 1, len(moves)) flat index of each cell's neighbour per move.
+    # Steps off the grid or into a blocked cell lead to the extra sentinel
+    # row n, which is its own neighbour everywhere.
+    n = grid_w * grid_h
+    walls = np.zeros(n + 1, dtype=bool)
+    walls[n] = True
+    for x, y in blocked:
+        walls[x * grid_w + y] = True
+    rows, cols = np.divmod(np.arange(n, dtype=np.int32), grid_w)
+    table = np.full((n + 1, len(moves)), n, dtype=np.int32)
+    for j, (dx, dy) in enumerate(moves):
+        nx, ny = rows + dx, cols + dy
+        inside = (nx >= 0) & (nx < grid_h) & (ny >= 0) & (ny < grid_w)
+        idx = np.where(inside, nx * grid_w + ny, n)
+        table[:n, j] = np.where(walls[idx], n, idx)
+    return table
+
+
+class FlowField:
+    """BFS step counts to the nearest of a set of target cells, around obstacles.
+
+    The moves and obstacles are baked into a neighbor_table, which fields
+    over the same terrain share. Every cell stores its distance and the
+    target it leads to, so distance() is O(1) and step() only looks at the
+    cell's own neighbours. Target changes are queued until sync(), which
+    applies them in one level-by-level pass: cells that led to a removed
+    target are cleared and refilled from the edge of their region, and
+    added targets spread out from themselves. Syncing once per tick, all
+    agents sharing a target set share one (usually partial) BFS.
+    """
+
+    def __init__(self, grid_w, moves, neighbors, positions=()):
+        self.grid_w = grid_w
+        self.moves = list(moves)
+        self.neighbors = neighbors
+        self.n = n = len(neighbors) - 1
+        self.unreached = np.iinfo(np.int32).max
+        self.counts = np.zeros(n, dtype=np.int32)
+        for pos in positions:
+            self.counts[pos[0] * grid_w + pos[1]] += 1
+        self.size = int(self.counts.sum())
+        self.changes = set()
+        self.mark = np.zeros(n + 1, dtype=bool)
+        self.stale = True
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, pos):
+        return self.counts.item(pos[0] * self.grid_w + pos[1]) > 0
+
+    def add(self, pos):
+        c = pos[0] * self.grid_w + pos[1]
+        self.counts[c] += 1
+        self.size += 1
+        if self.counts.item(c) == 1:
+            self.changes.add(c)
+
+    def remove(self, pos):
+        c = pos[0] * self.grid_w + pos[1]
+        self.counts[c] -= 1
+        self.size -= 1
+        if self.counts.item(c) == 0:
+            self.changes.add(c)
+
+    def move(self, old, new):
+        if old != new:
+            self.remove(old)
+            self.add(new)
+
+    def distance(self, pos):
+        # Steps to the nearest reachable target as of the last sync(); `unreached` if there is none
+        if self.stale:
+            self.rebuild()
+        return self.dist.item(pos[0] * self.grid_w + pos[1])
+
+    def step(self, pos):
+        # The first move (in `moves` order) onto a cell one step closer; (0, 0) on a target or when cut off
+        if self.stale:
+            self.rebuild()
+        dist = self.dist
+        c = pos[0] * self.grid_w + pos[1]
+        best, move = dist.item(c), (0, 0)
+        for m, nb in zip(self.moves, self.neighbors[c].tolist()):
+            d = dist.item(nb)
+            if 0 <= d < best:
+                best, move = d, m
+        return move
+
+    def sync(self):
+        # Bring the field up to date with every target change since the last sync
+        if self.stale:
+            self.rebuild()
+            return
+        if not self.changes:
+            return
+        dist, src, counts = self.dist, self.src, self.counts
+        changed = np.fromiter(self.changes, dtype=np.int64, count=len(self.changes))
+        self.changes.clear()
+        live = counts[changed] > 0
+        removed = changed[~live & (dist[changed] == 0)]
+        added = changed[live & (dist[changed] != 0)]
+        if 2 * len(removed) > self.size:
+            # Most regions would be cleared anyway (e.g. every target moved)
+            self.rebuild()
+            return
+        seeds = added
+        if len(removed):
+            region = self.clear(removed)
+            edge = distinct(self.neighbors[region].ravel())
+            edge = edge[(dist[edge] >= 0) & (dist[edge] < self.unreached)]
+            seeds = np.concatenate([edge, added])
+        dist[added] = 0
+        src[added] = added
+        self.spread(seeds)
+
+    def clear(self, removed):
+        # Unset every cell that led to one of the removed targets. Each such
+        # cell got its target from a neighbour with the same target, so a
+        # flood fill from the targets finds them all without a full scan.
+        dist, src, neighbors, mark = self.dist, self.src, self.neighbors, self.mark
+        mark[removed] = True  # src -1 indexes the sentinel, which is never marked
+        parts = [removed]
+        frontier = removed
+        while len(frontier):
+            dist[frontier] = self.unreached
+            src[frontier] = -1
+            nb = distinct(neighbors[frontier].ravel())
+            frontier = nb[mark[src[nb]]]
+            parts.append(frontier)
+        mark[removed] = False
+        return np.concatenate(parts)
+
+    def rebuild(self):
+        # Sentinel n has distance -1, so it is never entered and never chosen
+        self.dist = np.full(self.n + 1, self.unreached, dtype=np.int32)
+        self.dist[self.n] = -1
+        self.src = np.full(self.n + 1, -1, dtype=np.int64)
+        targets = np.flatnonzero(self.counts > 0)
+        self.dist[targets] = 0
+        self.src[targets] = targets
+        self.changes.clear()
+        self.stale = False
+        self.spread(targets)
+
+    def spread(self, seeds):
+        # BFS outward from seeds whose distances are final, lowering any
+        # distance it can improve; seeds join when the wave reaches their level
+        if not len(seeds):
+            return
+        dist, src, neighbors = self.dist, self.src, self.neighbors
+        k = neighbors.shape[1]
+        seeds = seeds[np.argsort(dist[seeds], kind='stable')]
+        levels = dist[seeds]
+        d = int(levels[0])
+        start = 0
+        frontier = seeds[:0]
+        while True:
+            end = int(np.searchsorted(levels, d, side='right'))
+            if end > start:
+                frontier = np.concatenate([frontier, seeds[start:end]])
+                start = end
+            if not len(frontier):
+                if start == len(seeds):
+                    return
+                d = int(levels[start])
+                continue
+            nb = neighbors[frontier].ravel()
+            origin = np.repeat(src[frontier], k)
+            better = dist[nb] > d + 1
+            nb, origin = nb[better], origin[better]
+            # Several frontier cells can reach one neighbour; the first in the frontier wins
+            order = np.argsort(nb, kind='stable')
+            nb, origin = nb[order], origin[order]
+            keep = np.empty(len(nb), dtype=bool)
+            keep[:1] = True
+            np.not_equal(nb[1:], nb[:-1], out=keep[1:])
+            nb = nb[keep]
+            dist[nb] = d + 1
+            src[nb] = origin[keep]
+            frontier = nb
+            d += 1
@@ -0,0 +1,202 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+import time
+
+from constants import ALPHA, EPSILON, GAMMA, REWARDS
+from encoders import ENCODERS, make_encoder
+from qtable import ArrayQTable, BoundedQTable
+from simulation import POLICIES, Simulation
+
+LEARNING = {'alpha': ALPHA, 'gamma': GAMMA, 'epsilon': EPSILON}
+METRICS = ['episodes', 'win_rate', 'mean_score', 'mean_lives_lost', 'mean_clear_ticks', 'timeouts', 'wall_time']
+
+
+def parse_param(text):
+    # "alpha=0.05,0.1" -> ('alpha', [0.05, 0.1]); "alpha=0.01:0.5" -> ('alpha', (0.01, 0.5))
+    name, _, values = text.partition('=')
+    name = name.strip()
+    if name not in LEARNING and name not in REWARDS:
+        raise argparse.ArgumentTypeError(f"unknown parameter {name!r}; choose from "
+                                         f"{', '.join(list(LEARNING) + list(REWARDS))}")
+    try:
+        if ':' in values:
+            lo, hi = (float(v) for v in values.split(':'))
+            return name, (lo, hi)
+        return name, [float(v) for v in values.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad values in {text!r}; use a,b,c or lo:hi") from None
+
+
+def grid_configs(params):
+    # Every combination of the listed values
+    for name, values in params.items():
+        if isinstance(values, tuple):
+            raise ValueError(f"{name}: lo:hi ranges need --random")
+    names = list(params)
+    for combo in itertools.product(*(params[n] for n in names)):
+        yield dict(zip(names, combo))
+
+
+def random_configs(params, count, seed):
+    # `count` samples: ranges are drawn uniformly, value lists by choice; same seed, same configs
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {name: round(rng.uniform(*values), 6) if isinstance(values, tuple) else rng.choice(values)
+               for name, values in params.items()}
+
+
+def config_id(config, game):
+    # Stable across runs, so a resumed sweep recognises the rows it already wrote
+    key = json.dumps([sorted(config.items()), sorted(game.items())])
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def run_job(job):
+    # One configuration and seed: fresh Q-tables learning over `episodes` headless games
+    cid, config, seed, game = job
+    learning = {name: config.get(name, default) for name, default in LEARNING.items()}
+    rewards = {name: value for name, value in config.items() if name in REWARDS}
+    start = time.perf_counter()
+    encoder = make_encoder(game['encoder'])
+    if game['q_budget'] or not encoder.compact:
+        budget = int((game['q_budget'] or 64) * 2 ** 20)
+        q_humans, q_tigers = BoundedQTable(budget), BoundedQTable(budget)
+    else:
+        q_humans, q_tigers = ArrayQTable(), ArrayQTable()
+    sim = Simulation(game['grid_w'], game['grid_h'], q_humans, q_tigers, lives=game['lives'],
+                     max_ticks=game['max_ticks'], humans=game['humans'], tigers=game['tigers'], food=game['food'],
+                     seed=seed, rewards=rewards, encoder=encoder, policy=game['policy'], **learning)
+    wins = timeouts = score = lives_lost = clear_ticks = 0
+    for episode in range(game['episodes']):
+        if episode:
+            sim.reset()
+        while not sim.done:
+            sim.step()
+        score += sim.score
+        lives_lost += sim.start_lives - max(sim.lives, 0)
+        if sim.result == 'win':
+            wins += 1
+            clear_ticks += sim.tick
+        elif sim.result == 'timeout':
+            timeouts += 1
+    n = game['episodes']
+    row = {'config_id': cid, 'seed': seed, 'policy': game['policy'], 'encoder': game['encoder'],
+           'q_budget': game['q_budget'] or '', **config,
+           'episodes': n, 'win_rate': wins / n, 'mean_score': score / n, 'mean_lives_lost': lives_lost / n,
+           'mean_clear_ticks': clear_ticks / wins if wins else '', 'timeouts': timeouts,
+           'wall_time': round(time.perf_counter() - start, 3)}
+    return row
+
+
+def finished_jobs(path, fields):
+    # (config_id, seed) pairs already in the results file; drops a half-written last line
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+    if os.path.getsize(path) == 0:
+        return set()
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != fields:
+            raise ValueError(f"{path} has columns {reader.fieldnames}; this sweep writes {fields}. "
+                             "Use another --out or the same parameters as before.")
+        return {(row['config_id'], int(row['seed'])) for row in reader}
+
+
+def summarize(path, top=5):
+    # Best configurations by win rate, averaged over their seeds
+    groups = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            groups.setdefault(row['config_id'], []).append(row)
+    ranked = sorted(groups.values(), key=lambda rows: -sum(float(r['win_rate']) for r in rows) / len(rows))
+    for rows in ranked[:top]:
+        params = {k: v for k, v in rows[0].items() if k not in METRICS and k not in ('config_id', 'seed')}
+        win_rate = sum(float(r['win_rate']) for r in rows) / len(rows)
+        mean_score = sum(float(r['mean_score']) for r in rows) / len(rows)
+        print(f"{rows[0]['config_id']} win rate {win_rate:.3f} mean score {mean_score:.1f} "
+              f"over {len(rows)} seeds: {params}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sweep learning rates and reward shaping over headless games in parallel.",
+        epilog=f"Parameters: {', '.join(list(LEARNING) + list(REWARDS))}. "
+               "Give a list (alpha=0.05,0.1) for a grid or a range (alpha=0.01:0.5) with --random.")
+    parser.add_argument('--param', type=parse_param, action='append', default=[], metavar='NAME=VALUES',
+                        help="parameter values to sweep; repeat for each parameter")
+    parser.add_argument('--random', type=int, default=None, metavar='N',
+                        help="sample N random configurations instead of the full grid")
+    parser.add_argument('--sweep-seed', type=int, default=0, help="seed for --random sampling")
+    parser.add_argument('--seeds', type=int, default=3, help="game seeds per configuration")
+    parser.add_argument('--episodes', type=int, default=20, help="games played (and learned from) per seed")
+    parser.add_argument('--grid', default='20x20', help="grid size as WxH")
+    parser.add_argument('--humans', type=int, default=3)
+    parser.add_argument('--tigers', type=int, default=3)
+    parser.add_argument('--food', type=int, default=10)
+    parser.add_argument('--lives', type=int, default=3)
+    parser.add_argument('--max-ticks', type=int, default=3000)
+    parser.add_argument('--encoder', choices=sorted(ENCODERS), default='offset', help="state encoding")
+    parser.add_argument('--q-budget', type=float, default=None, metavar='MB',
+                        help="bound each Q-table to this many MB (default: dense table, or 64 MB for "
+                             "encoders too large for one)")
+    parser.add_argument('--policy', choices=POLICIES, default='q',
+                        help="how agents move: by their Q-tables (q), or along the flow fields (steer), "
+                             "where learning never changes the outcome")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--out', default='sweep.csv', help="results table; rerun with the same arguments to resume")
+    args = parser.parse_args(argv)
+
+    params = dict(args.param)
+    try:
+        if args.random is not None:
+            configs = list(random_configs(params, args.random, args.sweep_seed))
+        else:
+            configs = list(grid_configs(params))
+    except ValueError as e:
+        parser.error(str(e))
+    grid_w, grid_h = (int(v) for v in args.grid.lower().split('x'))
+    game = dict(grid_w=grid_w, grid_h=grid_h, humans=args.humans, tigers=args.tigers, food=args.food,
+                lives=args.lives, max_ticks=args.max_ticks, episodes=args.episodes, encoder=args.encoder,
+                q_budget=args.q_budget, policy=args.policy)
+    if args.policy == 'steer':
+        print("note: with --policy steer the agents ignore their Q-tables, so the outcome columns do not "
+              "depend on the swept parameters")
+
+    # The game setup is part of every row, so files mixing policies, encoders or budgets still tell them apart
+    fields = ['config_id', 'seed', 'policy', 'encoder', 'q_budget'] + list(params) + METRICS
+    try:
+        done = finished_jobs(args.out, fields)
+    except ValueError as e:
+        parser.error(str(e))
+    jobs = [(cid, config, seed, game) for config in configs for cid in [config_id(config, game)]
+            for seed in range(args.seeds) if (cid, seed) not in done]
+    total = len(configs) * args.seeds
+    print(f"{total} runs, {total - len(jobs)} already in {args.out}")
+
+    if jobs:
+        new_file = not os.path.exists(args.out) or os.path.getsize(args.out) == 0
+        with open(args.out, 'a', newline='') as f, mp.Pool(args.workers or os.cpu_count() or 1) as pool:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            if new_file:
+                writer.writeheader()
+            # Rows land as runs finish, so an interrupted sweep loses only the runs in flight
+            for count, row in enumerate(pool.imap_unordered(run_job, jobs), 1):
+                writer.writerow(row)
+                f.flush()
+                print(f"[{total - len(jobs) + count}/{total}] {row['config_id']} seed {row['seed']}: "
+                      f"win rate {row['win_rate']:.2f}, mean score {row['mean_score']:.1f}, {row['wall_time']}s")
+    summarize(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from constants import ALL_ACTIONS
+from qtable import ArrayQTable, Autosaver, BoundedQTable
+
+
+def test_bounded_table_keeps_states_with_equal_hashes_apart():
+    # hash(-1) == hash(-2) in CPython, so these two states hash alike
+    a, b = (1, 2, -1, 0, 0, 0, 0, 0), (1, 2, -2, 0, 0, 0, 0, 0)
+    assert hash(a) == hash(b)
+    table = BoundedQTable(budget=1 << 20)
+    table.update(a, ALL_ACTIONS[0], 10.0, a, ALL_ACTIONS[0], 0.5, 0.0)
+    assert table.get(a, ALL_ACTIONS[0]) == 5.0
+    assert table.get(b, ALL_ACTIONS[0]) == 0.0
+    assert len(table) == 1
+    table.update(b, ALL_ACTIONS[0], -10.0, b, ALL_ACTIONS[0], 0.5, 0.0)
+    assert len(table) == 2
+    assert table.get(a, ALL_ACTIONS[0]) == 5.0
+    assert table.get(b, ALL_ACTIONS[0]) == -5.0
+
+
+def test_bounded_table_eviction_frees_exact_keys():
+    table = BoundedQTable(budget=8 * 400)
+    states = [(i, -1 - i % 2) for i in range(table.capacity + 1)]
+    for s in states:
+        table.update(s, ALL_ACTIONS[0], 1.0, s, ALL_ACTIONS[0], 1.0, 0.0)
+    assert table.evictions > 0
+    assert len(table) <= table.capacity
+    assert all(table.keys[row] == s for s, row in table.rows.items())
+
+
+def test_autosaver_survives_failed_writes(tmp_path):
+    # The target is a directory, so every save fails when it renames the temp file over it
+    target = tmp_path / 'checkpoint.qtb'
+    target.mkdir()
+    saver = Autosaver(str(target), interval=0.0)
+    tables = ArrayQTable(), ArrayQTable()
+    assert saver.maybe_save(*tables, 0.1, 0.9, 0.1, force=True)
+    assert saver.maybe_save(*tables, 0.1, 0.9, 0.1, force=True)
+    saver.close()
+    assert isinstance(saver.error, OSError)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['checkpoint.qtb']
+
+
+def test_autosaver_never_blocks_once_its_writer_is_gone(tmp_path):
+    saver = Autosaver(str(tmp_path / 'checkpoint.qtb'))
+    saver.close()
+    assert not saver.maybe_save(ArrayQTable(), ArrayQTable(), 0.1, 0.9, 0.1, force=True)
+    saver.close()
@@ -0,0 +1,48 @@
+import pytest
+
+from replay import ReplayPlayer, ReplayRecorder
+from simulation import Simulation
+
+
+def record(path, seed):
+    # A finished recording and each tick's (tigers, humans, food, score)
+    sim = Simulation(12, 12, seed=seed, max_ticks=400)
+    recorder = ReplayRecorder(path, sim, keyframe_every=25)
+    states = {0: snapshot(sim)}
+    while not sim.done:
+        recorder.record(sim.step())
+        states[sim.tick] = snapshot(sim)
+    recorder.close()
+    return states
+
+
+def snapshot(game):
+    return (sorted(game.tigers.positions_by_id().values()), sorted(game.humans.positions_by_id().values()),
+            sorted(game.food_list), game.score)
+
+
+@pytest.mark.parametrize('seed', [2, 4, 9])
+def test_truncated_replays_load_up_to_the_last_complete_tick(tmp_path, seed):
+    full = tmp_path / 'full.rpl'
+    states = record(full, seed)
+    data = full.read_bytes()
+    cut = tmp_path / 'cut.rpl'
+    for end in range(1, len(data)):
+        cut.write_bytes(data[:end])
+        try:
+            player = ReplayPlayer(cut)
+        except ValueError:
+            continue  # cut before the first keyframe was complete
+        assert player.last_tick <= max(states)
+        for tick in range(0, player.last_tick + 1, 5):
+            player.seek(tick)
+            assert snapshot(player) == states[tick]
+
+
+def test_replay_cut_inside_the_first_keyframe_is_rejected(tmp_path):
+    full = tmp_path / 'full.rpl'
+    record(full, 1)
+    cut = tmp_path / 'cut.rpl'
+    cut.write_bytes(full.read_bytes()[:40])
+    with pytest.raises(ValueError, match="truncated or not a replay"):
+        ReplayPlayer(cut)
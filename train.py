@@ -0,0 +1,143 @@
+import argparse
+import multiprocessing as mp
+import os
+import random
+import time
+
+import numpy as np
+
+from batch_env import BatchEnv
+from constants import ALPHA, EPSILON, GAMMA
+from qtable import ArrayQTable, Autosaver, load_tables
+from simulation import Simulation
+
+# Per-process engine, created once by init_worker and reused for every round
+_worker = {}
+
+
+def init_worker(config, counter):
+    # Workers number themselves 0, 1, ... from a shared counter, so a seeded run gives
+    # every worker the same stream on every run whatever PIDs the OS hands out
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    seed = config['seed']
+    if seed is not None:
+        seed += index
+    random.seed(seed)
+    q_humans, q_tigers = ArrayQTable(), ArrayQTable()
+    if config['engine'] == 'batch':
+        engine = BatchEnv(config['envs_per_worker'], config['grid_w'], config['grid_h'], q_humans, q_tigers,
+                          alpha=config['alpha'], gamma=config['gamma'], epsilon=config['epsilon'], seed=seed)
+    else:
+        engine = Simulation(config['grid_w'], config['grid_h'], q_humans, q_tigers,
+                            alpha=config['alpha'], gamma=config['gamma'], epsilon=config['epsilon'],
+                            max_ticks=3000, seed=seed)
+    _worker.update(engine=engine, q_humans=q_humans, q_tigers=q_tigers)
+
+
+def run_engine(engine, steps):
+    # Returns (env steps, finished episodes) for one round
+    if isinstance(engine, BatchEnv):
+        episodes = engine.episodes
+        engine.run(steps)
+        return steps * engine.n_envs, engine.episodes - episodes
+    episodes = 0
+    for _ in range(steps):
+        engine.step()
+        if engine.done:
+            engine.reset()
+            episodes += 1
+    return steps, episodes
+
+
+def worker_round(args):
+    # Pull the global tables, train locally, and hand back values plus the visits made this round
+    q_humans, q_tigers, steps = args
+    local_h, local_t = _worker['q_humans'], _worker['q_tigers']
+    local_h.q[:] = q_humans
+    local_t.q[:] = q_tigers
+    local_h.visits[:] = 0
+    local_t.visits[:] = 0
+    start = time.perf_counter()
+    env_steps, episodes = run_engine(_worker['engine'], steps)
+    return {
+        'pid': os.getpid(),
+        'q_humans': local_h.q, 'visits_humans': local_h.visits,
+        'q_tigers': local_t.q, 'visits_tigers': local_t.visits,
+        'steps': env_steps, 'episodes': episodes, 'elapsed': time.perf_counter() - start,
+    }
+
+
+def merge_tables(table, q_values, visits):
+    # Visit-count-weighted average of the worker tables; unvisited entries keep their value
+    weights = np.stack(visits).astype(np.float64)
+    total = weights.sum(axis=0)
+    merged = (np.stack(q_values) * weights).sum(axis=0) / np.maximum(total, 1)
+    table.q[:] = np.where(total > 0, merged, table.q)
+    table.visits += total.astype(np.int32)
+
+
+def train(workers=None, rounds=10, sync_every=200, engine='batch', envs_per_worker=256, grid_w=20, grid_h=20,
+          alpha=ALPHA, gamma=GAMMA, epsilon=EPSILON, seed=None, q_humans=None, q_tigers=None, on_round=None):
+    workers = workers or os.cpu_count() or 1
+    q_humans = q_humans if q_humans is not None else ArrayQTable()
+    q_tigers = q_tigers if q_tigers is not None else ArrayQTable()
+    config = dict(engine=engine, envs_per_worker=envs_per_worker, grid_w=grid_w, grid_h=grid_h,
+                  alpha=alpha, gamma=gamma, epsilon=epsilon, seed=seed)
+
+    counter = mp.Value('i', 0)
+    with mp.Pool(workers, initializer=init_worker, initargs=(config, counter)) as pool:
+        for round_no in range(1, rounds + 1):
+            start = time.perf_counter()
+            results = pool.map(worker_round, [(q_humans.q, q_tigers.q, sync_every)] * workers)
+            merge_tables(q_humans, [r['q_humans'] for r in results], [r['visits_humans'] for r in results])
+            merge_tables(q_tigers, [r['q_tigers'] for r in results], [r['visits_tigers'] for r in results])
+            elapsed = time.perf_counter() - start
+
+            episodes = sum(r['episodes'] for r in results)
+            steps = sum(r['steps'] for r in results)
+            per_worker = ", ".join(f"{r['pid']}: {r['steps'] / r['elapsed']:.0f}" for r in results)
+            print(f"round {round_no}/{rounds}: {episodes / elapsed:.1f} episodes/s, "
+                  f"{steps / elapsed:.0f} steps/s total; steps/s per worker [{per_worker}]")
+            if on_round is not None:
+                on_round(round_no, q_humans, q_tigers)
+    return q_humans, q_tigers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the tiger and human Q-tables headlessly in parallel.")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--rounds', type=int, default=10, help="sync rounds to run")
+    parser.add_argument('--sync-every', type=int, default=200, help="ticks each worker runs between merges")
+    parser.add_argument('--engine', choices=['batch', 'sim'], default='batch')
+    parser.add_argument('--envs-per-worker', type=int, default=256, help="games per BatchEnv worker")
+    parser.add_argument('--grid', default='20x20', help="grid size as WxH")
+    parser.add_argument('--alpha', type=float, default=ALPHA)
+    parser.add_argument('--gamma', type=float, default=GAMMA)
+    parser.add_argument('--epsilon', type=float, default=EPSILON)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--checkpoint', default=None, help="Q-table file to resume from and autosave to")
+    parser.add_argument('--autosave-every', type=float, default=30.0, help="seconds between autosaves")
+    args = parser.parse_args(argv)
+
+    grid_w, grid_h = (int(v) for v in args.grid.lower().split('x'))
+    q_humans = q_tigers = autosaver = on_round = None
+    if args.checkpoint:
+        if os.path.exists(args.checkpoint):
+            q_humans, q_tigers, _ = load_tables(args.checkpoint)
+            print(f"resumed from {args.checkpoint}")
+        autosaver = Autosaver(args.checkpoint, args.autosave_every)
+
+        def on_round(round_no, q_humans, q_tigers):
+            autosaver.maybe_save(q_humans, q_tigers, args.alpha, args.gamma, args.epsilon,
+                                 force=round_no == args.rounds)
+
+    train(args.workers, args.rounds, args.sync_every, args.engine, args.envs_per_worker, grid_w, grid_h,
+          args.alpha, args.gamma, args.epsilon, args.seed, q_humans, q_tigers, on_round)
+    if autosaver is not None:
+        autosaver.close()
+
+
+if __name__ == "__main__":
+    main()
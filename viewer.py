@@ -0,0 +1,127 @@
+import argparse
+import socket
+import threading
+
+import pygame
+
+from bridge import Channel
+from render import Renderer
+from replay import ReplayPlayer
+from server import DEFAULT_ADDRESS, SEND_BUFFER, HELLO, KEYFRAME, TICK, read_hello, read_message
+from simulation import corner_cells
+
+
+class StreamState(ReplayPlayer):
+    """The game as last streamed by a server, in the shape Renderer draws.
+
+    Each KEYFRAME or TICK message is a replay keyframe or tick record on
+    its own, so applying one is ReplayPlayer's decoding pointed at the
+    message instead of a file.
+    """
+
+    def __init__(self, info):
+        self.grid_w, self.grid_h = info['grid_w'], info['grid_h']
+        self.keyframe_every = info['keyframe_every']
+        self.obstacles = info['obstacles']
+        self.safe_zones = corner_cells(self.grid_w, self.grid_h)
+        self.index = []
+        self.synced = False
+
+    def apply(self, kind, payload):
+        # Returns the tick's events; deltas before the first keyframe are skipped
+        self.data, self.pos, self.end = payload, 0, len(payload)
+        self.index = []
+        if kind == KEYFRAME:
+            self.load_keyframe(0)
+            self.synced = True
+            return []
+        if kind == TICK and self.synced:
+            return self.step()
+        return []
+
+
+def connect(address):
+    # A socket to HOST:PORT, or to a Unix socket path (anything containing a slash).
+    # A small receive buffer means a viewer that falls behind makes the
+    # server skip it ahead, rather than replaying seconds of old ticks.
+    if '/' in address:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SEND_BUFFER)
+        sock.connect(address)
+    else:
+        host, _, port = address.rpartition(':')
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SEND_BUFFER)
+        sock.connect((host or '127.0.0.1', int(port)))
+    return sock
+
+
+def exact_reader(stream):
+    # read(n) for read_message: exactly n bytes, or EOFError once the server hangs up
+    def read(n):
+        data = stream.read(n)
+        if len(data) < n:
+            raise EOFError
+        return data
+    return read
+
+
+def reader(stream, channel):
+    # Forward messages to the drawing thread until the server goes away
+    read = exact_reader(stream)
+    try:
+        while True:
+            channel.put(*read_message(read))
+    except (EOFError, OSError):
+        channel.put('closed')
+
+
+def watch(address, game_id, cell_size):
+    sock = connect(address)
+    sock.sendall(f"watch {game_id}\n".encode('ascii'))
+    stream = sock.makefile('rb')
+    try:
+        kind, payload = read_message(exact_reader(stream))
+    except EOFError:
+        raise SystemExit(f"{address} has no game {game_id}")
+    if kind != HELLO:
+        raise SystemExit(f"{address} did not greet with a game description")
+    state = StreamState(read_hello(payload))
+
+    channel = Channel()
+    threading.Thread(target=reader, args=(stream, channel), daemon=True).start()
+
+    pygame.init()
+    window = pygame.display.set_mode((state.grid_w * cell_size, state.grid_h * cell_size))
+    renderer = Renderer(window, state.grid_w, state.grid_h, cell_size, state.safe_zones, state.obstacles)
+    clock = pygame.time.Clock()
+    closed = False
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sock.close()
+                return
+        for kind, payload in channel.drain():
+            if kind == 'closed':
+                closed = True
+            else:
+                state.apply(kind, payload)
+        if state.synced:
+            status = "disconnected" if closed else f"game {game_id}"
+            pygame.display.set_caption(f"{status} tick {state.tick} score {state.score} lives {state.lives}")
+            renderer.draw(state)
+        clock.tick(60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch a game hosted by server.py.")
+    parser.add_argument('game', type=int, nargs='?', default=0, help="game ID")
+    parser.add_argument('--connect', default=DEFAULT_ADDRESS, help="HOST:PORT or a Unix socket path")
+    parser.add_argument('--cell-size', type=int, default=30)
+    args = parser.parse_args(argv)
+    watch(args.connect, args.game, args.cell_size)
+
+
+if __name__ == "__main__":
+    main()
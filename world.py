@@ -0,0 +1,271 @@
+from array import array
+
+from constants import ALL_ACTIONS, EDGE_ACTIONS, POWER_SPAWN_DELAY
+from scheduler import HUMAN_MOVE, POWER_END, POWER_SPAWN, TIGER_MOVE, next_on_cadence
+
+UNREACHED = 1 << 30
+
+# Per-game settings every fork shares, and the mutable state a fork copies
+RULES = ('grid_w', 'grid_h', 'walls', 'safe', 'tiger_interval', 'human_interval', 'eat_pause', 'retreat_wait',
+         'power_duration', 'danger_radius', 'food_score', 'max_ticks', 'start_lives')
+BUFFERS = ('t_cell', 't_paused', 't_next', 'h_cell', 'h_next', 'h_retreating', 'h_retreat_start',
+           'food', 'food_cells')
+COUNTERS = ('tick', 'score', 'lives', 'done', 'result', 'power_cell', 'power_active', 'power_end', 'power_spawn_at')
+
+
+class World:
+    """A whole game as a few flat buffers, cheap to fork for lookahead.
+
+    Cells are x * grid_w + y. Tigers and humans are slots in parallel
+    int arrays in agent ID order; a caught human's cell becomes -1 so the
+    slots (and any moves a planner keyed by slot) stay put. Food is one
+    byte per cell plus the list of food cells, and every timer is a plain
+    int: each agent's next move tick, the power-up's spawn and expiry.
+
+    step() plays one tick by Simulation's rules. Agents without a move from
+    the caller follow the game's built-in steering toward their nearest
+    target, measured straight-line instead of by the Simulation's flow
+    fields, so the two agree exactly on grids without walls. copy() and
+    restore() cost one memcpy per buffer.
+    """
+
+    __slots__ = RULES + BUFFERS + COUNTERS
+
+    @classmethod
+    def from_sim(cls, sim):
+        # Capture a Simulation's current state; its agent order is by ID
+        w = cls.__new__(cls)
+        w.grid_w, w.grid_h = sim.grid_w, sim.grid_h
+        w.walls = frozenset(x * sim.grid_w + y for x, y in sim.obstacles)
+        w.safe = frozenset(x * sim.grid_w + y for x, y in sim.safe_zones)
+        for name in RULES[4:]:
+            setattr(w, name, getattr(sim, name))
+
+        next_move = {}
+        w.power_spawn_at = w.power_end = -1
+        for tick, kind, _, _, item in sim.scheduler.heap:
+            if kind in (TIGER_MOVE, HUMAN_MOVE) and item.alive:
+                next_move[item.store.agent_type, item.id] = tick
+            elif kind == POWER_SPAWN:
+                w.power_spawn_at = tick
+            elif kind == POWER_END:
+                w.power_end = tick
+        tigers, humans = sim.tigers.by_id(), sim.humans.by_id()
+        w.t_cell = array('i', (t.x * w.grid_w + t.y for t in tigers))
+        w.t_paused = array('i', (t.paused_until for t in tigers))
+        w.t_next = array('i', (next_move.get(('tiger', t.id), -1) for t in tigers))
+        w.h_cell = array('i', (h.x * w.grid_w + h.y for h in humans))
+        w.h_next = array('i', (next_move.get(('human', h.id), -1) for h in humans))
+        w.h_retreating = bytearray(h.retreating for h in humans)
+        w.h_retreat_start = array('i', (h.retreat_start_time for h in humans))
+        w.food = bytearray(w.grid_w * w.grid_h)
+        w.food_cells = array('i', (x * w.grid_w + y for x, y in sim.food_list))
+        for c in w.food_cells:
+            w.food[c] = 1
+
+        w.tick, w.score, w.lives, w.done, w.result = sim.tick, sim.score, sim.lives, sim.done, sim.result
+        w.power_cell = -1 if sim.power_up is None else sim.power_up[0] * w.grid_w + sim.power_up[1]
+        w.power_active = sim.power_active
+        return w
+
+    def copy(self):
+        other = World.__new__(World)
+        for name in RULES + COUNTERS:
+            setattr(other, name, getattr(self, name))
+        for name in BUFFERS:
+            setattr(other, name, getattr(self, name)[:])
+        return other
+
+    def restore(self, src):
+        # Become a copy of src, reusing this world's buffers
+        for name in RULES + COUNTERS:
+            setattr(self, name, getattr(src, name))
+        for name in BUFFERS:
+            getattr(self, name)[:] = getattr(src, name)
+
+    @property
+    def humans_left(self):
+        return sum(1 for c in self.h_cell if c >= 0)
+
+    def due(self, tigers=True):
+        # Slots of the tigers (or humans) due to move on the next tick
+        tick = self.tick + 1
+        if tigers:
+            return [j for j, t in enumerate(self.t_next) if t == tick]
+        return [i for i, t in enumerate(self.h_next) if t == tick and self.h_cell[i] >= 0]
+
+    def step(self, rng, tiger_moves=None, human_moves=None):
+        # Advance one tick. tiger_moves/human_moves map slots to moves that
+        # replace the built-in steering for agents due this tick; rng places
+        # the power-up. Returns self.done.
+        if self.done:
+            return True
+        self.tick += 1
+        tick = self.tick
+        if self.power_spawn_at == tick:
+            self.spawn_power(rng)
+        if self.power_end == tick:
+            self.power_active = False
+            self.power_end = -1
+            self.power_spawn_at = tick + rng.randint(*POWER_SPAWN_DELAY)
+
+        tigers = [j for j, t in enumerate(self.t_next) if t == tick]
+        if tigers:
+            self.move_tigers(tigers, tiger_moves or {})
+            for j in tigers:
+                self.t_next[j] = next_on_cadence(tick, self.t_paused[j] - tick, self.tiger_interval)
+            if self.done:
+                return True
+            if self.power_cell >= 0 and self.power_cell in self.t_cell:
+                self.power_active = True
+                self.power_end = tick + self.power_duration + 1
+                self.power_cell = -1
+
+        humans = [i for i, t in enumerate(self.h_next) if t == tick and self.h_cell[i] >= 0]
+        if humans:
+            self.move_humans(humans, human_moves or {})
+            for i in humans:
+                delay = 0
+                if self.h_retreating[i] and self.h_cell[i] in self.safe:
+                    delay = self.h_retreat_start[i] + self.retreat_wait - tick
+                self.h_next[i] = next_on_cadence(tick, delay, self.human_interval)
+
+        if not self.food_cells:
+            self.finish('win')
+        elif self.humans_left == 0:
+            self.finish('lose')
+        elif self.max_ticks is not None and tick >= self.max_ticks:
+            self.finish('timeout')
+        return self.done
+
+    def finish(self, result):
+        self.done = True
+        self.result = result
+
+    def move_tigers(self, tigers, moves):
+        gw = self.grid_w
+        humans = [divmod(c, gw) for c in self.h_cell if c >= 0]
+        food = [divmod(c, gw) for c in self.food_cells]
+        for j in tigers:
+            c = self.t_cell[j]
+            if j in moves:
+                move = moves[j]
+            elif not humans or manhattan(*divmod(c, gw), humans) <= 3:
+                # Attack mode: toward the nearest human
+                move = self.descend(c, humans, EDGE_ACTIONS, manhattan)
+            else:
+                # Guard mode: toward the nearest food
+                move = self.descend(c, food, EDGE_ACTIONS, manhattan)
+            c = self.t_cell[j] = self.moved(c, move)
+
+            if c in self.h_cell:
+                # The first created human on the cell is caught and the tiger stops to eat
+                self.t_paused[j] = self.tick + self.eat_pause
+                self.h_cell[self.h_cell.index(c)] = -1
+                self.lives -= 1
+                if self.lives <= 0:
+                    self.finish('lose')
+                return
+
+    def move_humans(self, humans, moves):
+        # Food eaten in this phase is still a target until the next tick, as with Simulation's flow field
+        gw = self.grid_w
+        food = [divmod(c, gw) for c in self.food_cells]
+        safe = [divmod(c, gw) for c in self.safe]
+        tigers = [divmod(c, gw) for c in self.t_cell]
+        for i in humans:
+            c = self.h_cell[i]
+            if self.h_retreating[i]:
+                if c in self.safe:
+                    if self.tick - self.h_retreat_start[i] >= self.retreat_wait:
+                        self.h_retreating[i] = False
+                    else:
+                        continue
+                else:
+                    move = moves[i] if i in moves else self.safe_step(c, safe, tigers)
+                    self.h_cell[i] = self.moved(c, move)
+                    continue
+
+            move = moves[i] if i in moves else self.safe_step(c, food, tigers)
+            c = self.h_cell[i] = self.moved(c, move)
+            if self.food[c]:
+                self.food[c] = 0
+                self.food_cells.remove(c)
+                self.score += self.food_score
+                self.h_retreating[i] = True
+                self.h_retreat_start[i] = self.tick
+
+    def moved(self, c, move):
+        # The cell after move; moves off the grid or into a wall leave the agent where it is
+        x, y = divmod(c, self.grid_w)
+        nx, ny = x + move[0], y + move[1]
+        if 0 <= nx < self.grid_h and 0 <= ny < self.grid_w:
+            n = nx * self.grid_w + ny
+            if n not in self.walls:
+                return n
+        return c
+
+    def descend(self, c, targets, moves, metric):
+        # First move (in `moves` order) to the lowest distance below the current one; (0, 0) if none
+        gw = self.grid_w
+        best = metric(*divmod(c, gw), targets)
+        step = (0, 0)
+        for move in moves:
+            n = self.moved(c, move)
+            if n != c:
+                d = metric(*divmod(n, gw), targets)
+                if d < best:
+                    best, step = d, move
+        return step
+
+    def safe_step(self, c, targets, tigers):
+        # The move toward targets that keeps clear of every tiger; else the plain step toward them
+        gw = self.grid_w
+        best, best_move = None, None
+        for move in ALL_ACTIONS:
+            n = self.moved(c, move)
+            if n == c:
+                continue
+            x, y = divmod(n, gw)
+            if manhattan(x, y, tigers) > self.danger_radius:
+                d = chebyshev(x, y, targets)
+                if best is None or d < best:
+                    best, best_move = d, move
+        return best_move if best_move is not None else self.descend(c, targets, ALL_ACTIONS, chebyshev)
+
+    def spawn_power(self, rng):
+        # A uniformly drawn empty cell, or a retry next tick on a full board
+        taken = set(self.t_cell) | set(self.h_cell) | self.walls
+        free = [c for c in range(self.grid_w * self.grid_h) if not self.food[c] and c not in taken]
+        if free:
+            self.power_cell = rng.choice(free)
+            self.power_spawn_at = -1
+        else:
+            self.power_spawn_at = self.tick + 1
+
+    def positions(self):
+        # (tiger cells, live human cells, food cells) as (x, y) tuples
+        gw = self.grid_w
+        return ([divmod(c, gw) for c in self.t_cell], [divmod(c, gw) for c in self.h_cell if c >= 0],
+                [divmod(c, gw) for c in self.food_cells])
+
+
+def manhattan(x, y, points):
+    # Distance from (x, y) to the nearest of points; UNREACHED if there are none
+    best = UNREACHED
+    for px, py in points:
+        d = abs(x - px) + abs(y - py)
+        if d < best:
+            best = d
+    return best
+
+
+def chebyshev(x, y, points):
+    # The same in king moves, which is how far 8-direction walkers are from a target
+    best = UNREACHED
+    for px, py in points:
+        dx, dy = abs(x - px), abs(y - py)
+        d = dx if dx > dy else dy
+        if d < best:
+            best = d
+    return best